@@ -2,16 +2,49 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from app.config import settings
-from app.database import db
+from app.repositories import users
 from app.models import UserInDB
-from app.utils.security import verify_password
-# Remove async/await for Firestore (synchronous client) unless using async adapter
-# But typical python firebase-admin is sync. Let's check requirements.
-# The user wants "firebase-admin". It is synchronous.
+from app.utils.security import verify_and_update_password
+from app.utils.cache import TTLCache
+from app.utils import metrics
+# firebase-admin is synchronous; app.repositories runs its calls in a thread pool
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+# Resolved users keyed by token subject (email), so repeat requests skip the
+# Firestore lookup. Entries never hold the password hash.
+principal_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+metrics.register_cache("auth", principal_cache)
+
+def invalidate_user(email: str = None):
+    """Drops cached principals for one user, or all of them when email is None."""
+    if email is None:
+        principal_cache.clear()
+    else:
+        principal_cache.pop(email)
+
+users.subscribe(invalidate_user)
+
+def request_principal(scope) -> str:
+    """
+    Who an ASGI request counts as for per-user limits: the subject of a valid
+    bearer token (checked without a database read), else the client address.
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    email = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]).get("sub")
+                except JWTError:
+                    email = None
+                if email:
+                    return f"user:{email}"
+            break
+    client = scope.get("client")
+    return f"addr:{client[0] if client else 'unknown'}"
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -24,42 +57,42 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-        
-    # Firestore Query
-    users_ref = db.collection("users")
-    query = users_ref.where("email", "==", email).limit(1).stream()
-    
-    user_doc = None
-    for doc in query:
-        user_data = doc.to_dict()
-        user_data["uid"] = doc.id
-        user_doc = user_data
-        break
+
+    # Tokens minted with a signed uid claim need no database read at all
+    uid = payload.get("uid")
+    if uid and settings.JWT_UID_CLAIM:
+        return {"uid": uid, "email": email}
+
+    user_doc = principal_cache.get(email)
+    if user_doc is not None:
+        return user_doc
+
+    user_doc = await users.get_by_email(email)
         
     if user_doc is None:
         raise credentials_exception
-        
+
+    user_doc.pop("hashed_password", None)
+    principal_cache.set(email, user_doc)
     return user_doc
 
-def authenticate_user(email: str, password: str):
-    # Firestore Query
+async def authenticate_user(email: str, password: str):
     print(f"DEBUG: Attempting login for email: {email}") # DEBUG
-    users_ref = db.collection("users")
-    query = users_ref.where("email", "==", email).limit(1).stream()
-    
-    user_doc = None
-    for doc in query:
-        user_doc = doc.to_dict()
-        break
+    user_doc = await users.get_by_email(email)
         
     if not user_doc:
         print("DEBUG: User not found in Firestore") # DEBUG
         return False
         
     print(f"DEBUG: User found. Verifying password...") # DEBUG
-    if not verify_password(password, user_doc["hashed_password"]):
+    valid, new_hash = await verify_and_update_password(password, user_doc["hashed_password"])
+    if not valid:
         print("DEBUG: Password verification failed") # DEBUG
         return False
+
+    if new_hash:
+        # Stored hash used an outdated bcrypt cost; replace it transparently
+        await users.update_password_hash(user_doc["uid"], email, new_hash)
     
     print("DEBUG: Authentication successful") # DEBUG
     return user_doc
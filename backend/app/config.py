@@ -6,6 +6,85 @@ class Settings(BaseSettings):
     JWT_SECRET: str = "change_me_in_production"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_HOURS: int = 24
+    JWT_UID_CLAIM: bool = True # Mint and trust a signed "uid" claim so auth needs no DB read
+    AUTH_CACHE_SIZE: int = 10000 # Resolved users kept for tokens without a uid claim
+    AUTH_CACHE_TTL_SECONDS: float = 300
+
+    # Password hashing pool
+    BCRYPT_ROUNDS: int = 12
+    HASH_WORKERS: int = 0 # 0 = one per usable CPU core
+    HASH_QUEUE_DEPTH: int = 32
+    HASH_TIMEOUT_SECONDS: float = 10
+
+    # VCF parsing
+    VCF_CHUNK_SIZE: int = 1024 * 1024 # Bytes read per chunk when streaming VCF uploads
+    VCF_TARGETED_PARSE: bool = True # Only parse records at PGx loci (see pgx_loci.py)
+
+    # Risk model
+    PGX_MODEL_FORMAT: str = "auto" # auto | pickle | native: auto prefers the XGBoost native export when present (see export_model.py)
+    MODEL_REGISTRY_DIR: str = "models" # Versioned model artifacts (see model_registry.py), relative to backend/
+    PGX_RISK_TABLE: str = "lazy" # off | lazy | eager: precomputed (phenotypes, drug) risk lookup
+    MODEL_WARMUP: bool = True # Load the model in the background once the server is up; /ready reports progress
+
+    # Admin API
+    ADMIN_TOKEN: str = "" # X-Admin-Token for /api/admin endpoints; empty disables them
+
+    # Executor for VCF parsing and model inference
+    ANALYSIS_EXECUTOR: str = "process" # process | thread | inline
+    ANALYSIS_WORKERS: int = 0 # 0 = one per usable CPU core, at most 4 processes
+    ANALYSIS_QUEUE_DEPTH: int = 16 # Tasks allowed to wait for a free worker before rejecting
+    ANALYSIS_TIMEOUT_SECONDS: float = 300
+    RETRY_AFTER_SECONDS: int = 5 # Retry-After sent with 429/503 responses when overloaded
+
+    # Admission control for /api/analyze and /api/analyze/cohort (see app/utils/admission.py)
+    ANALYZE_CONCURRENCY: int = 0 # Requests processed at once; 0 = two per analysis worker, so uploads overlap parsing
+    ANALYZE_QUEUE_DEPTH: int = 32 # Requests allowed to wait for a slot before new ones get 503
+    ANALYZE_QUEUE_TIMEOUT_SECONDS: float = 30 # Longest wait for a slot before 503
+    ANALYZE_PER_USER: int = 4 # Running + waiting requests per user before 429; 0 = no limit
+
+    # Uploads
+    MAX_UPLOAD_MB: int = 512 # Body limit for VCF uploads (analyze, cohort, jobs), enforced while streaming; 0 = no limit
+
+    # Analysis caches
+    GENOTYPE_CACHE_SIZE: int = 256 # Parsed uploads kept, keyed by content hash
+    PREDICTION_CACHE_SIZE: int = 10000 # Drug results kept, keyed by (genotypes, drug, model version)
+
+    # Cohort analysis
+    COHORT_BATCH_SIZE: int = 256 # Samples scored per model call by /api/analyze/cohort
+
+    # Pre-forked server workers (gunicorn.conf.py)
+    SERVER_WORKERS: int = 1 # Server processes. Jobs, /metrics and admission limits are per process, see gunicorn.conf.py
+    WORKER_MAX_REQUESTS: int = 10000 # Gracefully restart a worker after this many requests (plus up to 10% jitter); 0 = never
+    WORKER_MAX_MEMORY_MB: int = 1024 # Gracefully restart a worker whose private (non-shared) memory exceeds this; 0 = never
+    WORKER_MEMORY_CHECK_SECONDS: float = 30
+
+    # Background analysis jobs (/api/jobs)
+    JOB_WORKERS: int = 4 # Jobs run concurrently; their parse/predict steps share the analysis executor
+    JOB_QUEUE_DEPTH: int = 64 # Jobs allowed to wait before submissions are rejected
+    JOB_STORE_SIZE: int = 1000 # Finished jobs kept for polling
+    JOB_RETENTION_SECONDS: float = 3600
+
+    # Storage for users and analyses
+    STORAGE_BACKEND: str = "firestore" # firestore | sqlite | memory
+    SQLITE_PATH: str = "pharmaguard.db" # Used when STORAGE_BACKEND=sqlite
+
+    # Thread pool for the synchronous Firestore/SQLite clients
+    DB_THREADS: int = 32
+    DB_QUEUE_DEPTH: int = 256
+    DB_TIMEOUT_SECONDS: float = 30
+
+    # Analysis history
+    HISTORY_PAGE_SIZE: int = 50 # Default page size for /api/results
+    HISTORY_MAX_PAGE_SIZE: int = 200
+    HISTORY_INDEX_SIZE: int = 201 # Newest summaries kept in each user's index document; at least HISTORY_MAX_PAGE_SIZE + 1
+    RESULT_CACHE_SIZE: int = 1000 # Serialized analysis results kept in memory
+
+    # Responses
+    RESPONSE_COMPRESSION: bool = True # brotli (if installed) or gzip per Accept-Encoding
+    COMPRESSION_MIN_SIZE: int = 1024 # Smaller bodies are sent as is
+
+    # Observability
+    METRICS_ENABLED: bool = True # Per-route/stage timings and counters on /metrics (Prometheus format)
     
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
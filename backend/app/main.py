@@ -1,15 +1,82 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth_routes, analysis_routes, results_routes
+from app.routes import auth_routes, analysis_routes, results_routes, job_routes, admin_routes
 from app.config import settings
-from fastapi.staticfiles import StaticFiles
+from app.services.executor import analysis_executor
+from app.services.jobs import job_queue
+from app.services.warmup import readiness, warm_up
+from app.repositories import db_executor
+from app.utils.security import hash_executor
+from app.utils.executors import ExecutorSaturated, ExecutorTimeout
+from app.utils import metrics
+from app.utils.compression import CompressionMiddleware
+from app.utils.static_files import StaticBundle
+from app.utils.admission import AdmissionControl, AdmissionMiddleware, UploadLimitMiddleware
+from app.auth import request_principal
 from pathlib import Path
+from contextlib import asynccontextmanager
+import asyncio
 import os
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs alongside request handling; startup doesn't wait for the model
+    warmup = asyncio.create_task(warm_up()) if settings.MODEL_WARMUP else None
+    yield
+    if warmup is not None:
+        warmup.cancel()
+    await job_queue.shutdown()
+    analysis_executor.shutdown()
+    db_executor.shutdown()
+    hash_executor.shutdown()
+
 app = FastAPI(
     title="PharmaGuard Backend",
     description="Backend API for PharmaGuard Pharmacogenomics Platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Overload: reject fast with Retry-After instead of queueing without bound
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(ExecutorTimeout)
+async def executor_timeout_handler(request: Request, exc: ExecutorTimeout):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Analysis timed out, please retry"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# Admission control: bound concurrent analyses (fair-shared between users) and
+# upload sizes before any of the body is read. Added first so CORS headers and
+# metrics also cover the rejections.
+analyze_admission = AdmissionControl(
+    "analyze",
+    max_active=settings.ANALYZE_CONCURRENCY or 2 * analysis_executor.max_workers,
+    max_waiting=settings.ANALYZE_QUEUE_DEPTH,
+    per_user=settings.ANALYZE_PER_USER,
+    wait_timeout=settings.ANALYZE_QUEUE_TIMEOUT_SECONDS,
+    retry_after=settings.RETRY_AFTER_SECONDS,
+)
+metrics.register_admission(analyze_admission)
+app.add_middleware(
+    AdmissionMiddleware,
+    control=analyze_admission,
+    paths=("/api/analyze", "/api/analyze/cohort"),
+    user_of=request_principal,
+)
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_bytes=settings.MAX_UPLOAD_MB * 1024 * 1024,
+    paths=("/api/analyze", "/api/analyze/cohort", "/api/jobs"),
 )
 
 # CORS Middleware
@@ -25,22 +92,50 @@ app.add_middleware(
     allow_credentials=True,# restrict later
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+if settings.RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
+# Request latency per route (served on /metrics)
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Include Routes
 app.include_router(auth_routes.router)
 app.include_router(analysis_routes.router)
 app.include_router(results_routes.router)
+app.include_router(job_routes.router)
+app.include_router(admin_routes.router)
 
 @app.get("/")
 async def root():
     return {"message": "PharmaGuard API is running"}
 
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    # 503 until the model is loaded (or if it can't be), for load balancer health checks
+    is_ready, details = readiness()
+    return JSONResponse(status_code=200 if is_ready else 503, content=details)
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 frontend_path = Path(__file__).resolve().parent.parent.parent / "frontend" / "dist"
+frontend = StaticBundle(frontend_path)
 
-app.mount("/assets", StaticFiles(directory=frontend_path / "assets"), name="assets")
+# Hashed build output: cached by browsers for a year, served precompressed
+@app.get("/assets/{path:path}", include_in_schema=False)
+async def assets(path: str, request: Request):
+    return await frontend.serve(frontend.lookup(f"assets/{path}"), request)
 
-@app.get("/{full_path:path}")
-async def catch_all(full_path: str):
-    return FileResponse(frontend_path / "index.html")
\ No newline at end of file
+@app.get("/{full_path:path}", include_in_schema=False)
+async def catch_all(full_path: str, request: Request):
+    # index.html for client-side routes; it is revalidated via ETag so new deploys show up
+    name = full_path if full_path in frontend.root_files else "index.html"
+    return await frontend.serve(frontend.lookup(name), request)
\ No newline at end of file
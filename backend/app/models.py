@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Union
 from datetime import datetime
 
 # --- Auth Models ---
@@ -50,6 +50,7 @@ class QualityMetrics(BaseModel):
     vcf_parsing_success: bool
     variant_count: int
     model_available: bool
+    model_version: Optional[str] = None
 
 class DrugResult(BaseModel):
     drug: str
@@ -64,6 +65,31 @@ class AnalysisResultResponse(BaseModel):
     timestamp: str
     results: List[DrugResult]
 
+# view=compact: detected variants listed once at the top level instead of
+# in every drug result's profile
+class CompactPharmacogenomicProfile(BaseModel):
+    primary_gene: str
+    diplotype: str
+    phenotype: str
+
+class CompactDrugResult(DrugResult):
+    pharmacogenomic_profile: CompactPharmacogenomicProfile
+
+class CompactAnalysisResponse(BaseModel):
+    patient_id: str
+    timestamp: str
+    variant_count: int
+    variants: List[Variant]
+    results: List[CompactDrugResult]
+
+# For routes with a view parameter
+ANALYSIS_VIEW_RESPONSES = {
+    200: {
+        "model": Union[AnalysisResultResponse, CompactAnalysisResponse],
+        "description": "AnalysisResultResponse, or CompactAnalysisResponse with view=compact",
+    }
+}
+
 # --- History Models ---
 class AnalysisHistoryItem(BaseModel):
     id: str
@@ -0,0 +1,23 @@
+from app.config import settings
+from app.repositories.base import AnalysisRepository, EmailAlreadyRegistered, UserRepository, SUMMARY_FIELDS
+from app.repositories.executor import db_executor
+
+
+def _create_repositories():
+    backend = settings.STORAGE_BACKEND
+    if backend == "firestore":
+        # Imported here so other backends never initialize firebase_admin
+        from app.repositories.firestore import FirestoreUserRepository, FirestoreAnalysisRepository
+        return FirestoreUserRepository(), FirestoreAnalysisRepository()
+    if backend == "sqlite":
+        from app.repositories.sqlite import SqliteDatabase, SqliteUserRepository, SqliteAnalysisRepository
+        database = SqliteDatabase(settings.SQLITE_PATH)
+        return SqliteUserRepository(database), SqliteAnalysisRepository(database)
+    if backend == "memory":
+        from app.repositories.memory import MemoryUserRepository, MemoryAnalysisRepository
+        return MemoryUserRepository(), MemoryAnalysisRepository()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+# Async data access for routes and auth helpers
+users, analyses = _create_repositories()
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Optional
+from app.repositories.executor import db_executor
+
+# Fields needed for history listings; the heavy result payload is never fetched
+SUMMARY_FIELDS = ["id", "file_name", "drugs", "timestamp"]
+
+
+class EmailAlreadyRegistered(Exception):
+    """Raised by UserRepository.create when another user already has the email."""
+
+
+class UserRepository:
+    """
+    Async user storage. Backends implement the synchronous _get_by_email,
+    _create and _update, which run on db_executor unless _call is overridden.
+    Each call is timed as the db_read or db_write metrics stage.
+    """
+
+    def __init__(self):
+        self._listeners = []
+
+    def subscribe(self, listener):
+        """Registers listener(email) to be called whenever a user record changes."""
+        self._listeners.append(listener)
+
+    def _notify(self, email: str):
+        for listener in self._listeners:
+            listener(email)
+
+    async def _call(self, stage: str, fn, *args):
+        return await db_executor.run(fn, *args, stage=stage)
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        """User record (with its ID as "uid") or None."""
+        return await self._call("db_read", self._get_by_email, email)
+
+    async def create(self, user_data: dict) -> str:
+        """
+        Stores a new user under a generated ID and returns that ID. Raises
+        EmailAlreadyRegistered if the backend enforces unique emails and the
+        email was registered concurrently.
+        """
+        uid = await self._call("db_write", self._create, user_data)
+        self._notify(user_data["email"])
+        return uid
+
+    async def update_password_hash(self, uid: str, email: str, hashed_password: str):
+        await self._call("db_write", self._update, uid, {"hashed_password": hashed_password})
+        self._notify(email)
+
+    def _get_by_email(self, email: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def _create(self, user_data: dict) -> str:
+        raise NotImplementedError
+
+    def _update(self, uid: str, fields: dict):
+        raise NotImplementedError
+
+
+class AnalysisRepository:
+    """Async analysis storage; see UserRepository for how backends plug in."""
+
+    async def _call(self, stage: str, fn, *args):
+        return await db_executor.run(fn, *args, stage=stage)
+
+    async def create(self, record: dict):
+        await self._call("db_write", self._create, record)
+
+    async def list_summaries(self, user_id: str, limit: int, start_after: Optional[datetime] = None) -> list:
+        """
+        Up to `limit` analysis summaries (SUMMARY_FIELDS) of a user, newest
+        first, strictly older than start_after when given.
+        """
+        return await self._call("db_read", self._list_summaries, user_id, limit, start_after)
+
+    async def get_for_user(self, analysis_id: str, user_id: str) -> Optional[dict]:
+        """The full analysis record, or None if missing or owned by another user."""
+        return await self._call("db_read", self._get_for_user, analysis_id, user_id)
+
+    def _create(self, record: dict):
+        raise NotImplementedError
+
+    def _list_summaries(self, user_id: str, limit: int, start_after: Optional[datetime]) -> list:
+        raise NotImplementedError
+
+    def _get_for_user(self, analysis_id: str, user_id: str) -> Optional[dict]:
+        raise NotImplementedError
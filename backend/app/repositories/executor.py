@@ -0,0 +1,14 @@
+from app.config import settings
+from app.utils.executors import BoundedExecutor
+
+# The Firestore and SQLite clients are synchronous. Every call goes through
+# this pool so handlers await storage round trips instead of blocking the
+# event loop.
+db_executor = BoundedExecutor(
+    "database",
+    kind="thread",
+    max_workers=settings.DB_THREADS,
+    max_queue=settings.DB_QUEUE_DEPTH,
+    timeout=settings.DB_TIMEOUT_SECONDS,
+    retry_after=settings.RETRY_AFTER_SECONDS,
+)
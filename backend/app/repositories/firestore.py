@@ -0,0 +1,97 @@
+from datetime import datetime
+from typing import Optional
+from firebase_admin import firestore
+from app.config import settings
+from app.database import db
+from app.repositories.base import SUMMARY_FIELDS, AnalysisRepository, UserRepository
+
+
+class FirestoreUserRepository(UserRepository):
+    collection = "users"
+
+    def _get_by_email(self, email: str) -> Optional[dict]:
+        query = db.collection(self.collection).where("email", "==", email).limit(1).stream()
+        for doc in query:
+            user_data = doc.to_dict()
+            user_data["uid"] = doc.id
+            return user_data
+        return None
+
+    def _create(self, user_data: dict) -> str:
+        _, doc_ref = db.collection(self.collection).add(user_data)
+        return doc_ref.id
+
+    def _update(self, uid: str, fields: dict):
+        db.collection(self.collection).document(uid).update(fields)
+
+
+def _index_size() -> int:
+    # The first page is read with limit + 1 to detect a next page, so the
+    # index must cover the largest page plus one
+    return max(settings.HISTORY_INDEX_SIZE, settings.HISTORY_MAX_PAGE_SIZE + 1)
+
+
+class FirestoreAnalysisRepository(AnalysisRepository):
+    collection = "analyses"
+    # One document per user holding the newest _index_size() summaries,
+    # maintained on write so the first history page is a single document read
+    index_collection = "analysis_index"
+
+    def _summary_query(self, user_id: str):
+        return db.collection(self.collection).where("user_id", "==", user_id) \
+            .order_by("timestamp", direction=firestore.Query.DESCENDING).select(SUMMARY_FIELDS)
+
+    def _create(self, record: dict):
+        analysis_ref = db.collection(self.collection).document(record["id"])
+        index_ref = db.collection(self.index_collection).document(record["user_id"])
+        summary = {field: record[field] for field in SUMMARY_FIELDS}
+
+        @firestore.transactional
+        def write(transaction):
+            items = self._read_index(transaction, index_ref, record["user_id"])
+            transaction.set(analysis_ref, record)
+            transaction.set(index_ref, {"items": ([summary] + items)[:_index_size()]})
+
+        write(db.transaction())
+
+    def _read_index(self, transaction, index_ref, user_id: str) -> list:
+        snapshot = index_ref.get(transaction=transaction)
+        if snapshot.exists:
+            return snapshot.to_dict().get("items", [])
+        # Users with analyses from before the index existed: seed it from a query
+        query = self._summary_query(user_id).limit(_index_size())
+        return [doc.to_dict() for doc in query.stream(transaction=transaction)]
+
+    def _list_summaries(self, user_id: str, limit: int, start_after: Optional[datetime]) -> list:
+        if start_after is None:
+            index_ref = db.collection(self.index_collection).document(user_id)
+            snapshot = index_ref.get()
+            if snapshot.exists:
+                items = snapshot.to_dict().get("items", [])
+            else:
+                # Seeding races with _create, so only this runs in a transaction
+                @firestore.transactional
+                def seed(transaction):
+                    items = self._read_index(transaction, index_ref, user_id)
+                    transaction.set(index_ref, {"items": items})
+                    return items
+
+                items = seed(db.transaction())
+            # A short index holds every analysis the user has
+            if len(items) >= limit or len(items) < _index_size():
+                return items[:limit]
+
+        query = self._summary_query(user_id)
+        if start_after is not None:
+            query = query.start_after({"timestamp": start_after})
+        return [doc.to_dict() for doc in query.limit(limit).stream()]
+
+    def _get_for_user(self, analysis_id: str, user_id: str) -> Optional[dict]:
+        # Analyses are stored under document(id), so this is a keyed get
+        snapshot = db.collection(self.collection).document(analysis_id).get()
+        if not snapshot.exists:
+            return None
+        record = snapshot.to_dict()
+        if record.get("user_id") != user_id:
+            return None
+        return record
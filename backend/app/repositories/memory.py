@@ -0,0 +1,70 @@
+import bisect
+import uuid
+from datetime import datetime
+from typing import Optional
+from app.repositories.base import SUMMARY_FIELDS, AnalysisRepository, EmailAlreadyRegistered, UserRepository
+from app.utils.metrics import timed
+
+
+# Plain dicts, accessed only from the event loop: calls run inline rather
+# than on db_executor. Data is lost on restart.
+
+class MemoryUserRepository(UserRepository):
+    def __init__(self):
+        super().__init__()
+        self._users = {} # uid -> user data
+        self._by_email = {} # email -> uid
+
+    async def _call(self, stage: str, fn, *args):
+        with timed(stage):
+            return fn(*args)
+
+    def _get_by_email(self, email: str) -> Optional[dict]:
+        uid = self._by_email.get(email)
+        if uid is None:
+            return None
+        user_data = dict(self._users[uid])
+        user_data["uid"] = uid
+        return user_data
+
+    def _create(self, user_data: dict) -> str:
+        if user_data["email"] in self._by_email:
+            raise EmailAlreadyRegistered(user_data["email"])
+        uid = uuid.uuid4().hex
+        self._users[uid] = dict(user_data)
+        self._by_email[user_data["email"]] = uid
+        return uid
+
+    def _update(self, uid: str, fields: dict):
+        if uid in self._users:
+            self._users[uid].update(fields)
+
+
+class MemoryAnalysisRepository(AnalysisRepository):
+    def __init__(self):
+        self._records = {} # id -> record
+        self._by_user = {} # user_id -> [(timestamp, id)], oldest first
+
+    async def _call(self, stage: str, fn, *args):
+        with timed(stage):
+            return fn(*args)
+
+    def _create(self, record: dict):
+        self._records[record["id"]] = dict(record)
+        bisect.insort(self._by_user.setdefault(record["user_id"], []), (record["timestamp"], record["id"]))
+
+    def _list_summaries(self, user_id: str, limit: int, start_after: Optional[datetime]) -> list:
+        keys = self._by_user.get(user_id, [])
+        # Everything before `end` is strictly older than start_after
+        end = len(keys) if start_after is None else bisect.bisect_left(keys, (start_after,))
+        page = keys[max(end - limit, 0):end]
+        return [
+            {field: self._records[analysis_id][field] for field in SUMMARY_FIELDS}
+            for _, analysis_id in reversed(page)
+        ]
+
+    def _get_for_user(self, analysis_id: str, user_id: str) -> Optional[dict]:
+        record = self._records.get(analysis_id)
+        if record is None or record.get("user_id") != user_id:
+            return None
+        return dict(record)
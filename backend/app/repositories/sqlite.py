@@ -0,0 +1,144 @@
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional
+from app.repositories.base import AnalysisRepository, EmailAlreadyRegistered, UserRepository
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    uid TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users (email);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    drugs TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    result_encoding TEXT,
+    result_blob BLOB
+);
+CREATE INDEX IF NOT EXISTS analyses_user_timestamp ON analyses (user_id, timestamp DESC);
+"""
+
+
+def _timestamp(value: datetime) -> str:
+    # Fixed-width ISO strings sort in time order
+    return value.isoformat(timespec="microseconds")
+
+
+class SqliteDatabase:
+    """
+    A SQLite file shared by the SQLite repositories. Each db_executor thread
+    gets its own connection; WAL mode lets readers run alongside a writer.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+class SqliteUserRepository(UserRepository):
+    def __init__(self, database: SqliteDatabase):
+        super().__init__()
+        self.database = database
+
+    def _get_by_email(self, email: str) -> Optional[dict]:
+        row = self.database.connect().execute(
+            "SELECT uid, data FROM users WHERE email = ?", (email,)
+        ).fetchone()
+        if row is None:
+            return None
+        user_data = json.loads(row["data"])
+        user_data["uid"] = row["uid"]
+        return user_data
+
+    def _create(self, user_data: dict) -> str:
+        uid = uuid.uuid4().hex
+        try:
+            with self.database.connect() as conn:
+                conn.execute(
+                    "INSERT INTO users (uid, email, data) VALUES (?, ?, ?)",
+                    (uid, user_data["email"], json.dumps(user_data, default=str)),
+                )
+        except sqlite3.IntegrityError as e:
+            # The unique email index caught a concurrent signup
+            raise EmailAlreadyRegistered(user_data["email"]) from e
+        return uid
+
+    def _update(self, uid: str, fields: dict):
+        with self.database.connect() as conn:
+            row = conn.execute("SELECT data FROM users WHERE uid = ?", (uid,)).fetchone()
+            if row is None:
+                return
+            user_data = json.loads(row["data"])
+            user_data.update(fields)
+            conn.execute("UPDATE users SET data = ? WHERE uid = ?", (json.dumps(user_data, default=str), uid))
+
+
+class SqliteAnalysisRepository(AnalysisRepository):
+    def __init__(self, database: SqliteDatabase):
+        self.database = database
+
+    def _create(self, record: dict):
+        with self.database.connect() as conn:
+            conn.execute(
+                "INSERT INTO analyses (id, user_id, file_name, drugs, timestamp, result_encoding, result_blob) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record["id"],
+                    record["user_id"],
+                    record["file_name"],
+                    json.dumps(record["drugs"]),
+                    _timestamp(record["timestamp"]),
+                    record.get("result_encoding"),
+                    record.get("result_blob"),
+                ),
+            )
+
+    def _list_summaries(self, user_id: str, limit: int, start_after: Optional[datetime]) -> list:
+        # Served entirely by the (user_id, timestamp) index
+        sql = "SELECT id, file_name, drugs, timestamp FROM analyses WHERE user_id = ?"
+        params = [user_id]
+        if start_after is not None:
+            sql += " AND timestamp < ?"
+            params.append(_timestamp(start_after))
+        sql += " ORDER BY timestamp DESC LIMIT ?"
+        params.append(limit)
+        return [
+            {
+                "id": row["id"],
+                "file_name": row["file_name"],
+                "drugs": json.loads(row["drugs"]),
+                "timestamp": datetime.fromisoformat(row["timestamp"]),
+            }
+            for row in self.database.connect().execute(sql, params)
+        ]
+
+    def _get_for_user(self, analysis_id: str, user_id: str) -> Optional[dict]:
+        row = self.database.connect().execute(
+            "SELECT * FROM analyses WHERE id = ?", (analysis_id,)
+        ).fetchone()
+        if row is None or row["user_id"] != user_id:
+            return None
+        record = dict(row)
+        record["drugs"] = json.loads(record["drugs"])
+        record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+        return record
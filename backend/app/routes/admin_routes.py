@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Header
+from typing import Optional
+import hmac
+from app.config import settings
+from model_registry import ModelValidationError
+from app.services.model_service import activate_model, list_models
+
+router = APIRouter()
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    # Hidden entirely unless an ADMIN_TOKEN is configured
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.get("/api/admin/models", dependencies=[Depends(require_admin)])
+async def get_models():
+    """Registry versions, the ACTIVE one, and the version a worker is serving."""
+    return await list_models()
+
+@router.post("/api/admin/models/{version}/activate", dependencies=[Depends(require_admin)])
+async def activate(version: str):
+    """
+    Validates the version against the expected features and swaps it in.
+    In-flight analyses finish on the previous version.
+    """
+    try:
+        return await activate_model(version)
+    except LookupError:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+    except ModelValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
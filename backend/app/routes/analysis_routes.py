@@ -1,58 +1,70 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 from datetime import datetime
-import uuid
-from app.services.vcf_service import process_vcf
-from app.services.prediction_service import predict_drug_risks
-from app.models import AnalysisResultResponse, AnalysisRecord
+import zlib
+from app.services.vcf_service import process_vcf_upload, process_cohort_upload
+from app.services.prediction_service import predict_drug_risks, iter_cohort_risks
+from app.services.analysis_service import parse_drugs, save_analysis, build_response, render_view
+from app.models import ANALYSIS_VIEW_RESPONSES, AnalysisRecord
 from app.auth import get_current_user
-from app.database import db
+from app.utils.fastjson import FastJSONResponse, dumps
 
 router = APIRouter()
 
-@router.post("/api/analyze", response_model=AnalysisResultResponse)
+@router.post("/api/analyze", response_model=None, responses=ANALYSIS_VIEW_RESPONSES)
 async def analyze_vcf(
     vcfFile: UploadFile = File(...),
     selectedDrugs: str = Form(...), # Expecting comma-separated or JSON string
+    vcfIndex: Optional[UploadFile] = File(None), # Optional .tbi/.csi for a bgzipped vcfFile
+    view: Literal["full", "compact"] = Query("full", description="compact: detected variants once at the top level"),
+    variants: Literal["pgx", "all"] = Query("pgx", description="Variants in the compact view"),
     current_user: dict = Depends(get_current_user)
 ):
-    # Parse drugs
-    if "," in selectedDrugs:
-        drugs_list = [d.strip() for d in selectedDrugs.split(",")]
-    else:
-        drugs_list = [selectedDrugs]
+    drugs_list = parse_drugs(selectedDrugs)
         
-    # Read VCF
-    content = await vcfFile.read()
-    genotypes = await process_vcf(content) # Note: vcf_parser is synchronous now (cpu bound)
+    # Stream VCF (plain, .vcf.gz or bgzip) without buffering the whole upload
+    try:
+        genotype_hash, genotypes = await process_vcf_upload(vcfFile, vcfIndex)
+    except (ValueError, zlib.error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid VCF file: {e}")
     
     # Predict
-    results = await predict_drug_risks(genotypes, drugs_list)
+    results = await predict_drug_risks(genotypes, drugs_list, genotype_hash)
     
-    # Create Result Object
-    unique_id = str(uuid.uuid4())
-    timestamp = datetime.now().isoformat()
-    patient_id = f"PATIENT_{unique_id[:8]}"
-    
-    response_data = AnalysisResultResponse(
-        patient_id=patient_id,
-        timestamp=timestamp,
-        results=results
-    )
-    
-    # Save to Firestore
+    # Create Result Object and save to history
     # User ID from Firestore doc
-    user_id = current_user.get("uid")
-    
-    record = {
-        "id": unique_id,
-        "user_id": user_id,
-        "file_name": vcfFile.filename,
-        "drugs": drugs_list,
-        "timestamp": datetime.now(),
-        "result_data": response_data.model_dump()
-    }
+    response_data, _ = await save_analysis(current_user.get("uid"), vcfFile.filename, drugs_list, results)
     
-    db.collection("analyses").document(unique_id).set(record)
-    
-    return response_data
+    return FastJSONResponse(render_view(response_data, view, variants))
+
+@router.post("/api/analyze/cohort")
+async def analyze_cohort(
+    vcfFile: UploadFile = File(...),
+    selectedDrugs: str = Form(...),
+    vcfIndex: Optional[UploadFile] = File(None),
+    view: Literal["full", "compact"] = Query("full", description="compact: detected variants once at the top level"),
+    variants: Literal["pgx", "all"] = Query("pgx", description="Variants in the compact view"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Scores every sample of a multi-sample VCF. Streams one
+    AnalysisResultResponse (CompactAnalysisResponse with view=compact) per
+    line (NDJSON), patient_id = sample name.
+    Cohort results are not saved to the analysis history.
+    """
+    drugs_list = parse_drugs(selectedDrugs)
+
+    try:
+        matrix = await process_cohort_upload(vcfFile, vcfIndex)
+    except (ValueError, zlib.error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid VCF file: {e}")
+
+    timestamp = datetime.now().isoformat()
+
+    async def lines():
+        async for sample_id, results in iter_cohort_risks(matrix, drugs_list):
+            response_data = build_response(sample_id, timestamp, results)
+            yield dumps(render_view(response_data, view, variants)) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from app.models import UserSignup, UserLogin, Token
-from app.database import db
-from app.utils.security import get_password_hash, create_access_token
+from app.repositories import EmailAlreadyRegistered, users
+from app.utils.security import hash_password, create_access_token
 from app.auth import authenticate_user
 from datetime import timedelta
 
@@ -10,14 +10,8 @@ router = APIRouter()
 
 @router.post("/api/signup", response_model=Token)
 async def signup(user_data: UserSignup):
-    # Check if user exists (Firestore)
-    users_ref = db.collection("users")
-    query = users_ref.where("email", "==", user_data.email).limit(1).stream()
-    
-    existing_user = None
-    for doc in query:
-        existing_user = doc
-        break
+    # Check if user exists
+    existing_user = await users.get_by_email(user_data.email)
         
     if existing_user:
         raise HTTPException(
@@ -26,16 +20,23 @@ async def signup(user_data: UserSignup):
         )
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     user_dict = user_data.model_dump()
     user_dict["hashed_password"] = hashed_password
     del user_dict["password"]
     
     # Save to Firestore (Auto ID)
-    db.collection("users").add(user_dict)
+    try:
+        uid = await users.create(user_dict)
+    except EmailAlreadyRegistered:
+        # Registered by a concurrent signup since the check above
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     # Create token
-    access_token = create_access_token(data={"sub": user_data.email})
+    access_token = create_access_token(data={"sub": user_data.email}, uid=uid)
     
     return {
         "access_token": access_token,
@@ -49,7 +50,7 @@ async def signup(user_data: UserSignup):
 
 @router.post("/api/login", response_model=Token)
 async def login(login_data: UserLogin):
-    user = authenticate_user(login_data.email, login_data.password)
+    user = await authenticate_user(login_data.email, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,7 +58,7 @@ async def login(login_data: UserLogin):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(data={"sub": user["email"]})
+    access_token = create_access_token(data={"sub": user["email"]}, uid=user.get("uid"))
     
     return {
         "access_token": access_token,
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Header
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional
+import json
+from app.auth import get_current_user
+from app.services.analysis_service import parse_drugs
+from app.services.jobs import Job, job_queue
+from app.services.vcf_service import save_upload
+
+router = APIRouter()
+
+SSE_HEARTBEAT_SECONDS = 15 # Comment line sent on idle streams so proxies keep them open
+
+@router.post("/api/jobs", status_code=202)
+async def submit_job(
+    vcfFile: UploadFile = File(...),
+    selectedDrugs: str = Form(...),
+    vcfIndex: Optional[UploadFile] = File(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Same inputs as /api/analyze, but returns at once with a job id. Poll
+    /api/jobs/{id} or follow /api/jobs/{id}/events (Server-Sent Events).
+    """
+    drugs_list = parse_drugs(selectedDrugs)
+    index_data = await vcfIndex.read() if vcfIndex is not None else None
+
+    # The request's upload is closed once we return, so keep our own copy
+    digest, path = await save_upload(vcfFile, prefix="job_")
+    job = Job(current_user.get("uid"), vcfFile.filename, drugs_list, digest, path, index_data)
+    job_queue.submit(job)
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/jobs/{job.id}",
+            "events_url": f"/api/jobs/{job.id}/events",
+        },
+        headers={"Location": f"/api/jobs/{job.id}"},
+    )
+
+@router.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    return _get_job(job_id, current_user).snapshot()
+
+@router.get("/api/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    last_event_id: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stage changes, phenotypes, each drug result and a final done/error event.
+    Reconnecting clients resume after Last-Event-ID.
+    """
+    job = _get_job(job_id, current_user)
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    async def stream():
+        async for item in job.follow(after, SSE_HEARTBEAT_SECONDS):
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            event_id, event, data = item
+            yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _get_job(job_id: str, current_user: dict) -> Job:
+    job = job_queue.get(job_id)
+    # Other users' jobs look the same as missing ones
+    if job is None or job.user_id != current_user.get("uid"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
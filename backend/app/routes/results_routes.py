@@ -1,25 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Literal, Optional
 from datetime import datetime
-from app.models import AnalysisHistoryItem, AnalysisResultResponse
+import hashlib
+from app.models import ANALYSIS_VIEW_RESPONSES, AnalysisHistoryItem, AnalysisResultResponse
 from app.auth import get_current_user
-from app.database import db
-import firebase_admin
-from firebase_admin import firestore
+from app.config import settings
+from app.repositories import analyses
+from app.utils.cursors import encode_cursor, decode_cursor
+from app.utils.cache import TTLCache
+from app.utils import metrics
+from app.utils.result_codec import load_result_data
+from app.utils.fastjson import dumps
+from app.services.analysis_service import render_view
 
 router = APIRouter()
 
+# Analyses never change after creation, so validated, serialized results can
+# be cached without expiry: (analysis_id, view) -> (user_id, JSON body, ETag)
+result_cache = TTLCache(maxsize=settings.RESULT_CACHE_SIZE)
+metrics.register_cache("result", result_cache)
+
+# Per-user data: browsers may keep it forever, shared caches must not
+RESULT_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
 @router.get("/api/results", response_model=List[AnalysisHistoryItem])
-async def get_results_history(current_user: dict = Depends(get_current_user)):
+async def get_results_history(
+    response: Response,
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    start_after: Optional[str] = Query(None, description="Cursor from a previous page's X-Next-Cursor header"),
+    current_user: dict = Depends(get_current_user)
+):
     user_id = current_user.get("uid")
-    
-    # Firestore Query
-    analyses_ref = db.collection("analyses")
-    query = analyses_ref.where("user_id", "==", user_id).order_by("timestamp", direction=firestore.Query.DESCENDING).stream()
+
+    cursor = None
+    if start_after:
+        try:
+            cursor = decode_cursor(start_after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid start_after cursor")
+
+    # Fetch one extra summary to learn whether another page exists
+    rows = await analyses.list_summaries(user_id, limit + 1, cursor)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["timestamp"])
     
     history = []
-    for doc in query:
-        data = doc.to_dict()
+    for data in rows:
         history.append(AnalysisHistoryItem(
             id=data["id"],
             fileName=data["file_name"],
@@ -29,20 +56,36 @@ async def get_results_history(current_user: dict = Depends(get_current_user)):
     
     return history
 
-@router.get("/api/results/{analysis_id}", response_model=AnalysisResultResponse)
-async def get_single_result(analysis_id: str, current_user: dict = Depends(get_current_user)):
+@router.get("/api/results/{analysis_id}", response_model=None, responses=ANALYSIS_VIEW_RESPONSES)
+async def get_single_result(
+    analysis_id: str,
+    request: Request,
+    view: Literal["full", "compact"] = Query("full", description="compact: detected variants once at the top level"),
+    variants: Literal["pgx", "all"] = Query("pgx", description="Variants in the compact view"),
+    current_user: dict = Depends(get_current_user)
+):
     user_id = current_user.get("uid")
-    
-    # Firestore Query
-    analyses_ref = db.collection("analyses")
-    query = analyses_ref.where("id", "==", analysis_id).where("user_id", "==", user_id).limit(1).stream()
-    
-    result_doc = None
-    for doc in query:
-        result_doc = doc.to_dict()
-        break
-    
-    if not result_doc:
+
+    cache_key = (analysis_id, view, variants if view == "compact" else None)
+    cached = result_cache.get(cache_key)
+    if cached is None:
+        result_doc = await analyses.get_for_user(analysis_id, user_id)
+
+        if not result_doc:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+
+        # Stored records (including older formats) are validated once, here
+        response_data = AnalysisResultResponse(**load_result_data(result_doc)).model_dump(mode="json")
+        body = dumps(render_view(response_data, view, variants))
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        cached = (result_doc["user_id"], body, etag)
+        result_cache.set(cache_key, cached)
+
+    owner_id, body, etag = cached
+    if owner_id != user_id:
         raise HTTPException(status_code=404, detail="Analysis not found")
-        
-    return AnalysisResultResponse(**result_doc["result_data"])
+
+    headers = {"ETag": etag, "Cache-Control": RESULT_CACHE_CONTROL}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,79 @@
+from datetime import datetime
+import uuid
+from pgx_loci import PGX_LOCI
+from app.models import DrugResult
+from app.repositories import analyses
+from app.utils.result_codec import encode_result, RESULT_ENCODING
+
+# Model results carry extra keys (patient_id, timestamp) the response drops
+DRUG_RESULT_FIELDS = tuple(DrugResult.model_fields)
+PGX_RSIDS = frozenset(locus.rsid for locus in PGX_LOCI)
+
+def parse_drugs(selectedDrugs: str) -> list[str]:
+    # Expecting comma-separated or a single drug
+    if "," in selectedDrugs:
+        return [d.strip() for d in selectedDrugs.split(",")]
+    return [selectedDrugs]
+
+def build_response(patient_id: str, timestamp: str, results: list) -> dict:
+    """
+    AnalysisResultResponse-shaped dict for drug results from the model.
+    The results are built by the server itself, so they are not re-validated.
+    """
+    return {
+        "patient_id": patient_id,
+        "timestamp": timestamp,
+        "results": [{field: result[field] for field in DRUG_RESULT_FIELDS if field in result} for result in results],
+    }
+
+def compact_response(response_data: dict, all_variants: bool = False) -> dict:
+    """
+    The compact view of a response: detected variants listed once at the top
+    level (PGx loci only unless all_variants) instead of in every drug result.
+    """
+    results = response_data["results"]
+    # Every drug result of an analysis comes from the same genotypes
+    detected = results[0]["pharmacogenomic_profile"].get("detected_variants", []) if results else []
+    variants = detected if all_variants else [v for v in detected if v["rsid"] in PGX_RSIDS]
+    compact_results = []
+    for result in results:
+        profile = {k: v for k, v in result["pharmacogenomic_profile"].items() if k != "detected_variants"}
+        compact_results.append({**result, "pharmacogenomic_profile": profile})
+    return {
+        "patient_id": response_data["patient_id"],
+        "timestamp": response_data["timestamp"],
+        "variant_count": len(detected),
+        "variants": variants,
+        "results": compact_results,
+    }
+
+def render_view(response_data: dict, view: str = "full", variants: str = "pgx") -> dict:
+    """Response in the requested view: "full" (AnalysisResultResponse) or "compact"."""
+    if view == "compact":
+        return compact_response(response_data, all_variants=variants == "all")
+    return response_data
+
+async def save_analysis(user_id: str, file_name: str, drugs: list[str], results: list):
+    """
+    Builds the analysis response for a set of drug results and saves it to
+    history. Returns (response dict, analysis id).
+    """
+    unique_id = str(uuid.uuid4())
+    timestamp = datetime.now().isoformat()
+    patient_id = f"PATIENT_{unique_id[:8]}"
+
+    response_data = build_response(patient_id, timestamp, results)
+
+    record = {
+        "id": unique_id,
+        "user_id": user_id,
+        "file_name": file_name,
+        "drugs": drugs,
+        "timestamp": datetime.now(),
+        # Variants stored once per analysis, compressed (see result_codec)
+        "result_encoding": RESULT_ENCODING,
+        "result_blob": encode_result(response_data)
+    }
+
+    await analyses.create(record)
+    return response_data, unique_id
@@ -0,0 +1,27 @@
+from app.config import settings
+from app.utils.executors import BoundedExecutor, available_cpus
+
+# Each process worker holds its own copy of the model (~190 MB)
+MAX_DEFAULT_PROCESS_WORKERS = 4
+
+def _preload_model():
+    # Runs once in each worker process, so tasks never pay for loading the model
+    import app.services.prediction_service  # noqa: F401
+    from training_models import model
+    model.load()
+
+def _default_workers() -> int:
+    cpus = available_cpus()
+    return min(cpus, MAX_DEFAULT_PROCESS_WORKERS) if settings.ANALYSIS_EXECUTOR == "process" else cpus
+
+# Shared pool for VCF parsing and model inference
+analysis_executor = BoundedExecutor(
+    "analysis",
+    kind=settings.ANALYSIS_EXECUTOR,
+    max_workers=settings.ANALYSIS_WORKERS or _default_workers(),
+    max_queue=settings.ANALYSIS_QUEUE_DEPTH,
+    timeout=settings.ANALYSIS_TIMEOUT_SECONDS,
+    retry_after=settings.RETRY_AFTER_SECONDS,
+    initializer=_preload_model if settings.ANALYSIS_EXECUTOR == "process" else None,
+    start_method="spawn",
+)
@@ -0,0 +1,201 @@
+import asyncio
+import os
+import time
+import uuid
+import zlib
+from typing import Optional
+from training_models import model
+from app.config import settings
+from app.models import DrugResult
+from app.services.analysis_service import save_analysis
+from app.services.prediction_service import predict_drug_risks
+from app.services.vcf_service import process_vcf_path
+from app.utils.cache import TTLCache
+from app.utils.executors import ExecutorSaturated, ExecutorTimeout
+
+
+class Job:
+    """
+    One background analysis. Progress is an append-only list of
+    (event, data) pairs; followers wait on _updated for new ones.
+    """
+
+    def __init__(self, user_id: str, file_name: str, drugs: list[str], upload_digest: str,
+                 upload_path: str, index_data: Optional[bytes] = None):
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.file_name = file_name
+        self.drugs = drugs
+        self.upload_digest = upload_digest
+        self.upload_path = upload_path
+        self.index_data = index_data
+        self.created_at = time.time()
+        self.status = "queued" # queued | running | done | failed
+        self.stage = "queued"
+        self.results = [] # Drug results finished so far (JSON-ready)
+        self.analysis_id = None
+        self.error = None
+        self.events = []
+        self._updated = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def emit(self, event: str, data: dict):
+        self.events.append((event, data))
+        # Wake every follower, then arm a fresh event for the next update
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def set_stage(self, stage: str):
+        self.stage = stage
+        self.emit("stage", {"stage": stage})
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "file_name": self.file_name,
+            "drugs": self.drugs,
+            "results": self.results,
+            "analysis_id": self.analysis_id,
+            "error": self.error,
+            "created_at": self.created_at,
+        }
+
+    async def follow(self, after: int = 0, heartbeat: Optional[float] = None):
+        """
+        Yields (event number, event, data) from event number `after` on,
+        until the job finishes. Yields None if nothing happened for
+        `heartbeat` seconds.
+        """
+        while True:
+            while after < len(self.events):
+                event, data = self.events[after]
+                after += 1
+                yield after, event, data
+            if self.finished:
+                return
+            try:
+                await asyncio.wait_for(self._updated.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+
+class JobQueue:
+    """
+    In-process job queue: a bounded asyncio.Queue drained by a fixed number
+    of worker tasks. The CPU-bound stages still run on analysis_executor;
+    workers only sequence them. Jobs are kept for JOB_RETENTION_SECONDS.
+    """
+
+    def __init__(self, workers: int, max_queue: int, max_jobs: int, retention: float, retry_after: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.jobs = TTLCache(maxsize=max_jobs, ttl=retention)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def submit(self, job: Job):
+        """
+        Queues a job, or raises ExecutorSaturated when the queue is full (the
+        job's upload is deleted).
+        """
+        self._start()
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            _remove(job.upload_path)
+            raise ExecutorSaturated("jobs", self.retry_after)
+        self.jobs.set(job.id, job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._queue is not None:
+            # Drop uploads of jobs that never started
+            while not self._queue.empty():
+                _remove(self._queue.get_nowait().upload_path)
+            self._queue = None
+
+    def _start(self):
+        # Created lazily so the queue and workers bind to the serving event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await run_job(job)
+            finally:
+                self._queue.task_done()
+
+
+async def run_job(job: Job):
+    """parse -> phenotype -> predict (one drug at a time) -> persist."""
+    job.status = "running"
+    try:
+        job.set_stage("parsing")
+        # Hands the upload over to the parse, which deletes it
+        genotype_hash, genotypes = await process_vcf_path(job.upload_digest, job.upload_path, job.index_data)
+
+        job.set_stage("phenotyping")
+        phenotypes = model.map_genotypes_to_phenotypes(genotypes)
+        job.emit("phenotypes", {"phenotypes": phenotypes, "variant_count": len(genotypes)})
+
+        job.set_stage("predicting")
+        results = []
+        for drug in job.drugs:
+            # Per-drug calls so each result can be reported as soon as it's
+            # ready; they still share the (genotypes, drug) prediction cache.
+            result = (await predict_drug_risks(genotypes, [drug], genotype_hash))[0]
+            results.append(result)
+            data = DrugResult.model_validate(result).model_dump(mode="json")
+            job.results.append(data)
+            job.emit("result", data)
+
+        job.set_stage("saving")
+        _, job.analysis_id = await save_analysis(job.user_id, job.file_name, job.drugs, results)
+
+        job.status = "done"
+        job.set_stage("done")
+        job.emit("done", {"analysis_id": job.analysis_id})
+    except (ValueError, zlib.error) as e:
+        _fail(job, f"Invalid VCF file: {e}")
+    except (ExecutorSaturated, ExecutorTimeout):
+        _fail(job, "Server is busy, please resubmit shortly")
+    except Exception as e:
+        print(f"Job {job.id} failed: {e}")
+        _fail(job, "Analysis failed")
+
+
+def _fail(job: Job, error: str):
+    job.status = "failed"
+    job.error = error
+    job.emit("error", {"detail": error})
+
+
+def _remove(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+job_queue = JobQueue(
+    workers=settings.JOB_WORKERS,
+    max_queue=settings.JOB_QUEUE_DEPTH,
+    max_jobs=settings.JOB_STORE_SIZE,
+    retention=settings.JOB_RETENTION_SECONDS,
+    retry_after=settings.RETRY_AFTER_SECONDS,
+)
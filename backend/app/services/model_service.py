@@ -0,0 +1,33 @@
+from training_models import model
+from app.services.executor import analysis_executor
+
+# Model registry operations. Models live in the analysis workers, so status
+# and activation run there; other workers follow ACTIVE on their next
+# prediction (see PharmacogenomicModel._check_artifacts).
+
+async def list_models() -> dict:
+    registry = model.registry()
+    return {
+        "active": registry.active_version(),
+        "versions": registry.versions(),
+        "serving": await analysis_executor.run(_model_status),
+    }
+
+async def activate_model(version: str) -> dict:
+    """
+    Validates and activates a registry version. Raises LookupError for an
+    unknown version and ModelValidationError if it doesn't validate.
+    """
+    if not model.registry().has_version(version):
+        raise LookupError(version)
+    return await analysis_executor.run(_activate, version)
+
+# --- Worker-side functions (run inside analysis_executor) ---
+
+def _model_status() -> dict:
+    model.load()
+    return model.status()
+
+def _activate(version: str) -> dict:
+    return model.activate(version)
+
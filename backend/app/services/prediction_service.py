@@ -1,11 +1,64 @@
+from typing import Optional
 from training_models import model
+from vcf_parser import GenotypeMatrix
+from app.config import settings
+from app.services.executor import analysis_executor
+from app.utils.cache import TTLCache, SingleFlight
+from app.utils import metrics
 
-async def predict_drug_risks(genotypes: dict, drugs: list[str]):
-    results = []
-    for drug in drugs:
-        prediction = model.predict(genotypes, drug)
-        results.append({
-            "drug": drug,
-            **prediction
-        })
-    return results
+# (genotype hash, drug, model version) -> drug result
+prediction_cache = TTLCache(maxsize=settings.PREDICTION_CACHE_SIZE)
+_predict_flights = SingleFlight()
+metrics.register_cache("prediction", prediction_cache)
+
+async def predict_drug_risks(genotypes: dict, drugs: list[str], genotype_hash: Optional[str] = None):
+    if genotype_hash is None:
+        # All drugs are scored in one batched model call, off the event loop
+        return await analysis_executor.run(_predict_batch, genotypes, drugs)
+
+    # Only drugs not yet predicted for this genotype and model version are computed
+    version = model.current_version()
+    results = {drug: prediction_cache.get((genotype_hash, drug, version)) for drug in drugs}
+    missing = [drug for drug, result in results.items() if result is None]
+    if missing:
+        fresh = await _predict_flights.do(
+            (genotype_hash, tuple(missing), version),
+            lambda: analysis_executor.run(_predict_batch, genotypes, missing),
+        )
+        for drug, result in zip(missing, fresh):
+            results[drug] = result
+            if not _cacheable(result):
+                continue
+            # Keyed by the version that produced it: workers may still be on
+            # the previous one until their next artifact check
+            produced_by = result["quality_metrics"]["model_version"] or version
+            prediction_cache.set((genotype_hash, drug, produced_by), result)
+    return [results[drug] for drug in drugs]
+
+def _cacheable(result: dict) -> bool:
+    # Fallback answers (no model loaded, or inference failed) are retried on
+    # the next request rather than served from the cache
+    return (result["quality_metrics"]["model_available"]
+            and result["risk_assessment"]["risk_label"] != "Unknown")
+
+async def iter_cohort_risks(matrix: GenotypeMatrix, drugs: list[str]):
+    """
+    Yields (sample id, drug results) for every sample in the matrix.
+    COHORT_BATCH_SIZE samples are scored per model call, so only one batch of
+    results is held at a time.
+    """
+    batch_size = settings.COHORT_BATCH_SIZE
+    for start in range(0, len(matrix), batch_size):
+        stop = min(start + batch_size, len(matrix))
+        batch = [matrix.sample_genotypes(i) for i in range(start, stop)]
+        results = await analysis_executor.run(_predict_cohort, batch, drugs)
+        for sample_id, sample_results in zip(matrix.samples[start:stop], results):
+            yield sample_id, sample_results
+
+# --- Worker-side functions (run inside analysis_executor) ---
+
+def _predict_batch(genotypes: dict, drugs: list[str]):
+    return model.predict_batch(genotypes, drugs)
+
+def _predict_cohort(genotypes_list: list[dict], drugs: list[str]):
+    return model.predict_cohort(genotypes_list, drugs)
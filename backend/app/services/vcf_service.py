@@ -1,4 +1,164 @@
-from vcf_parser import parse_vcf
+import hashlib
+import os
+import tempfile
+from typing import Optional, Tuple
+from fastapi import UploadFile
+from vcf_parser import (
+    GenotypeMatrix, parse_vcf_cohort_indexed, parse_vcf_cohort_stream,
+    parse_vcf_indexed, parse_vcf_stream,
+)
+from pgx_loci import PGX_TARGETS
+from app.config import settings
+from app.services.executor import analysis_executor
+from app.utils.cache import TTLCache, SingleFlight
+from app.utils import metrics
 
-async def process_vcf(file_content: bytes):
-    return parse_vcf(file_content)
+# Content-addressed cache of parsed uploads:
+# (sha256 of upload bytes, targeted) -> (genotype hash, genotypes)
+genotype_cache = TTLCache(maxsize=settings.GENOTYPE_CACHE_SIZE)
+_parse_flights = SingleFlight()
+metrics.register_cache("genotype", genotype_cache)
+
+async def process_vcf_upload(upload: UploadFile, index_upload: Optional[UploadFile] = None) -> Tuple[str, dict]:
+    """
+    Returns (genotype hash, genotypes) for an uploaded VCF. Re-uploads of the
+    same bytes are served from genotype_cache, and concurrent identical
+    uploads are parsed once.
+    """
+    index_data = await index_upload.read() if index_upload is not None else None
+    digest, path = await save_upload(upload)
+    return await process_vcf_path(digest, path, index_data)
+
+async def save_upload(upload: UploadFile, prefix: str = "upload_") -> Tuple[str, str]:
+    """
+    Copies an upload to a temp file that outlives the request, in fixed-size
+    chunks (memory stays bounded by VCF_CHUNK_SIZE), hashing the content on
+    the same pass. Returns (sha256 of the upload, path).
+    """
+    with tempfile.NamedTemporaryFile(prefix=prefix, suffix=".vcf", delete=False) as spool, \
+            metrics.timed("vcf_read"):
+        try:
+            digest = hashlib.sha256()
+            await upload.seek(0)
+            while True:
+                chunk = await upload.read(settings.VCF_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            _remove(spool.name)
+            raise
+    return digest.hexdigest(), spool.name
+
+async def process_vcf_path(digest: str, path: str, index_data: Optional[bytes] = None) -> Tuple[str, dict]:
+    """
+    process_vcf_upload for a file saved with save_upload. Takes over the
+    file: it is deleted once parsed, or right away if the result is cached
+    or the same bytes are already being parsed.
+    """
+    targeted = settings.VCF_TARGETED_PARSE
+    key = (digest, targeted)
+    parsed = genotype_cache.get(key)
+    if parsed is not None:
+        _remove(path)
+        return parsed
+
+    # The parse can outlive this caller (others may be waiting on it), so
+    # the flight, not the caller, owns the file and deletes it when done
+    owned = False
+
+    def parse():
+        nonlocal owned
+        owned = True
+        return _parse_owned(path, index_data, targeted)
+
+    try:
+        parsed = await _parse_flights.do(key, parse)
+    finally:
+        if not owned:
+            _remove(path)
+    genotype_cache.set(key, parsed)
+    return parsed
+
+async def _parse_owned(path: str, index_data: Optional[bytes], targeted: bool) -> Tuple[str, dict]:
+    try:
+        return await analysis_executor.run(_parse_path, path, index_data, targeted, stage="parse")
+    finally:
+        _remove(path)
+
+async def process_cohort_upload(upload: UploadFile, index_upload: Optional[UploadFile] = None) -> GenotypeMatrix:
+    """
+    Parses every sample column of a multi-sample VCF into a GenotypeMatrix.
+    Always restricted to the PGx loci, so memory scales with the sample count
+    rather than the file size.
+    """
+    index_data = await index_upload.read() if index_upload is not None else None
+    if analysis_executor.crosses_process:
+        # Worker processes need a path
+        _, path = await save_upload(upload)
+        try:
+            return await analysis_executor.run(_parse_cohort_path, path, index_data, stage="parse")
+        finally:
+            _remove(path)
+    await upload.seek(0)
+    return await analysis_executor.run(_parse_cohort_file, upload.file, index_data, stage="parse")
+
+def _remove(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def genotype_hash(genotypes: dict) -> str:
+    """Order-independent digest of a genotype map; equal maps share predictions."""
+    digest = hashlib.sha256()
+    for rsid, genotype in sorted(genotypes.items()):
+        digest.update(f"{rsid}\t{genotype}\n".encode())
+    return digest.hexdigest()
+
+def _targets(targeted: bool):
+    return PGX_TARGETS if targeted else None
+
+# --- Worker-side functions (run inside analysis_executor) ---
+
+def _parse_file(file_obj, index_data: Optional[bytes], targeted: bool):
+    targets = _targets(targeted)
+
+    # With a .tbi/.csi index next to a bgzipped VCF, seek straight to the PGx
+    # regions. Fall back to a full streaming scan if the pair can't be used.
+    genotypes = None
+    if index_data is not None and targets is not None:
+        try:
+            genotypes = parse_vcf_indexed(file_obj, index_data, targets)
+        except ValueError as e:
+            print(f"Indexed VCF read failed, scanning whole file: {e}")
+            file_obj.seek(0)
+
+    if genotypes is None:
+        # Compressed (.vcf.gz / bgzip) input is detected by the parser
+        genotypes = parse_vcf_stream(file_obj, settings.VCF_CHUNK_SIZE, targets)
+    metrics.VARIANTS_PARSED.inc(len(genotypes))
+    return genotype_hash(genotypes), genotypes
+
+def _parse_path(path: str, index_data: Optional[bytes], targeted: bool):
+    with open(path, "rb") as file_obj:
+        return _parse_file(file_obj, index_data, targeted)
+
+def _parse_cohort_file(file_obj, index_data: Optional[bytes]):
+    matrix = None
+    if index_data is not None:
+        try:
+            matrix = parse_vcf_cohort_indexed(file_obj, index_data, PGX_TARGETS)
+        except ValueError as e:
+            print(f"Indexed VCF read failed, scanning whole file: {e}")
+            file_obj.seek(0)
+    if matrix is None:
+        matrix = parse_vcf_cohort_stream(file_obj, settings.VCF_CHUNK_SIZE, PGX_TARGETS)
+    metrics.VARIANTS_PARSED.inc(int((matrix.codes >= 0).sum()))
+    return matrix
+
+def _parse_cohort_path(path: str, index_data: Optional[bytes]):
+    with open(path, "rb") as file_obj:
+        return _parse_cohort_file(file_obj, index_data)
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from typing import Optional
+from app.config import settings
+from app.services.executor import analysis_executor
+from training_models import model
+
+# Background model warmup. Startup no longer loads the model (see
+# PharmacogenomicModel.load), so the server accepts connections at once and
+# /ready reports when the first analysis will no longer pay for loading.
+
+_state = "cold" # cold | warming | warm | failed
+_worker_status: Optional[dict] = None # model.status() reported by a process worker
+_warm_seconds: Optional[float] = None
+
+
+def _model_status() -> dict:
+    # Runs in a worker process; the pool initializer has already loaded the model
+    model.load()
+    return model.status()
+
+
+async def warm_up():
+    """
+    Loads the model where analyses run: in a first process worker, or in
+    this process. The rest of the pool is spawned (each loading its own
+    copy) only once concurrent analyses need it.
+    """
+    global _state, _worker_status, _warm_seconds
+    _state = "warming"
+    started = time.perf_counter()
+    try:
+        if analysis_executor.crosses_process:
+            # The pool spawns workers on demand, so one task starts just one
+            _worker_status = await analysis_executor.run(_model_status)
+        else:
+            await asyncio.to_thread(model.load)
+        _state = "warm"
+    except Exception as e:
+        print(f"Model warmup failed: {e}")
+        _state = "failed"
+    _warm_seconds = time.perf_counter() - started
+
+
+def preload():
+    """
+    Loads what every server worker needs before a pre-forking server forks
+    them (see gunicorn.conf.py): the model with its feature index, and with
+    PGX_RISK_TABLE=lazy a fully filled risk table, so workers share these
+    pages copy-on-write instead of each building their own. The allele and
+    phenotype tables are built at import time.
+    """
+    global _state, _warm_seconds
+    started = time.perf_counter()
+    model.load()
+    active = model.active
+    if active is not None and active.risk_table is not None and model.risk_table_mode == "lazy":
+        active.risk_table.fill_all()
+    _state = "warm"
+    _warm_seconds = time.perf_counter() - started
+
+
+def readiness() -> tuple:
+    """(ready, details) for the /ready endpoint."""
+    if analysis_executor.crosses_process:
+        model_status = _worker_status or {"state": "unloaded"}
+    else:
+        model_status = model.status()
+    if settings.MODEL_WARMUP:
+        ready = model_status["state"] == "ready"
+    else:
+        # The first analysis loads the model, so only a known failure is not ready
+        ready = model_status["state"] != "unavailable"
+    if ready:
+        status = "ready"
+    elif _state in ("failed", "warm") or model_status["state"] == "unavailable":
+        status = "unavailable"
+    else:
+        status = "starting"
+    return ready, {
+        "status": status,
+        "warmup": _state,
+        "warmup_seconds": _warm_seconds,
+        "model": model_status,
+    }
@@ -0,0 +1,194 @@
+import asyncio
+from collections import deque
+from typing import Callable, Iterable, Optional
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request can't be admitted: 429 for a user over their share, 503 when the server is full."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionControl:
+    """
+    Limits how many requests run at once, with a bounded wait queue.
+
+    Up to max_active requests run; up to max_waiting more wait for a slot
+    (at most wait_timeout seconds) and anything beyond that is rejected at
+    once. Each user may hold at most per_user running or waiting requests,
+    and waiting requests are admitted round-robin across users, so one
+    client submitting a burst can't starve everyone queued behind it.
+    Accessed only from the event loop.
+    """
+
+    def __init__(self, name: str, max_active: int, max_waiting: int, per_user: int = 0,
+                 wait_timeout: Optional[float] = None, retry_after: int = 1):
+        self.name = name
+        self.max_active = max_active
+        self.max_waiting = max_waiting
+        self.per_user = per_user # 0 = no per-user limit
+        self.wait_timeout = wait_timeout or None
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self.rejected = {"user_limit": 0, "queue_full": 0, "queue_timeout": 0}
+        self._held = {} # user -> running + waiting requests
+        self._queues = {} # user -> deque of waiter futures, oldest first
+        self._turns = deque() # users with waiters, in admission order
+
+    async def acquire(self, user: str):
+        held = self._held.get(user, 0)
+        if self.per_user and held >= self.per_user:
+            self._reject("user_limit")
+        if self.active < self.max_active and not self._turns:
+            self.active += 1
+            self._held[user] = held + 1
+            return
+        if self.waiting >= self.max_waiting:
+            self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(user)
+        if queue is None:
+            queue = self._queues[user] = deque()
+            self._turns.append(user)
+        queue.append(waiter)
+        self.waiting += 1
+        self._held[user] = held + 1
+        try:
+            await asyncio.wait_for(waiter, self.wait_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up: hand the slot back
+                self.release(user)
+            else:
+                self._abandon(user, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("queue_timeout")
+            raise
+
+    def release(self, user: str):
+        self.active -= 1
+        self._forget(user)
+        while self.active < self.max_active and self._turns:
+            next_user = self._turns.popleft()
+            queue = self._queues[next_user]
+            waiter = queue.popleft()
+            if queue:
+                self._turns.append(next_user)
+            else:
+                del self._queues[next_user]
+            if waiter.cancelled():
+                # Its request is giving up; _abandon does the accounting
+                continue
+            self.waiting -= 1
+            self.active += 1
+            waiter.set_result(None)
+
+    def _abandon(self, user: str, waiter: asyncio.Future):
+        queue = self._queues.get(user)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[user]
+                self._turns.remove(user)
+        self.waiting -= 1
+        self._forget(user)
+
+    def _forget(self, user: str):
+        held = self._held[user] - 1
+        if held:
+            self._held[user] = held
+        else:
+            del self._held[user]
+
+    def _reject(self, reason: str):
+        self.rejected[reason] += 1
+        if reason == "user_limit":
+            raise AdmissionRejected(429, "Too many analyses in progress for this user", self.retry_after)
+        raise AdmissionRejected(503, "Server is busy, please retry shortly", self.retry_after)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware running POST requests to `paths` through an
+    AdmissionControl before their body is read, so waiting requests hold no
+    upload data. The slot is held until the response (streamed ones
+    included) is complete. user_of(scope) names the user a request counts
+    against.
+    """
+
+    def __init__(self, app, control: AdmissionControl, paths: Iterable[str], user_of: Callable):
+        self.app = app
+        self.control = control
+        self.paths = frozenset(paths)
+        self.user_of = user_of
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        user = self.user_of(scope)
+        try:
+            await self.control.acquire(user)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail},
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.control.release(user)
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware capping request bodies to `paths` at max_bytes. A larger
+    Content-Length is refused before anything is read; otherwise bytes are
+    counted as they arrive and the request fails with 413 as soon as the
+    limit is crossed, rather than after the whole upload has been spooled.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: Iterable[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.max_bytes or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Upload exceeds the {self.max_bytes // (1024 * 1024)} MB limit"
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_bytes:
+                    response = JSONResponse(status_code=413, content={"detail": detail})
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Re-raised by FastAPI's body parsing and answered by the app's exception handling
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
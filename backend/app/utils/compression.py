@@ -0,0 +1,143 @@
+import asyncio
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+# Brotli is optional (`pip install brotli`); without it only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript",
+                      "application/xml", "image/svg+xml")
+# Bodies larger than this are compressed in a thread so the event loop keeps serving
+THREAD_THRESHOLD = 256 * 1024
+
+
+def negotiate(accept_encoding: str, available: tuple = None) -> str:
+    """
+    Best of the available codings (most preferred first; default: br if the
+    brotli package is installed, then gzip) the Accept-Encoding header allows,
+    or "" for none.
+    """
+    offered = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[coding.strip().lower()] = q
+    wildcard = offered.get("*", 0.0)
+    if available is None:
+        available = ("br", "gzip") if brotli is not None else ("gzip",)
+    for coding in available:
+        if offered.get(coding, wildcard) > 0:
+            return coding
+    return ""
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31) # 31: gzip container
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # Non-final chunks are flushed so streamed lines reach the client at once
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip, as the client's
+    Accept-Encoding allows. Only compressible content types are touched;
+    bodies under minimum_size, already-encoded responses and Server-Sent
+    Events pass through. Streamed bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start = None # http.response.start, held until the first body chunk
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if passthrough or compressor is not None and message["type"] != "http.response.body":
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                # e.g. http.response.pathsend: nothing to compress
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not self._eligible(start["status"], headers, body, more_body):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # The encoded bytes differ, so the validator may only be weak
+                    headers["ETag"] = "W/" + etag
+                if "content-length" in headers:
+                    del headers["content-length"]
+                if not more_body:
+                    data = await self._compress(compressor, body, True)
+                    headers["Content-Length"] = str(len(data))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send(start)
+
+            data = await self._compress(compressor, body, not more_body)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _eligible(self, status: int, headers: MutableHeaders, body: bytes, more_body: bool) -> bool:
+        content_type = headers.get("content-type", "")
+        if status < 200 or status in (204, 304) or "content-encoding" in headers:
+            return False
+        if content_type.startswith("text/event-stream") or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        return more_body or len(body) >= self.minimum_size
+
+    @staticmethod
+    async def _compress(compressor: _Compressor, data: bytes, final: bool) -> bytes:
+        if len(data) > THREAD_THRESHOLD:
+            return await asyncio.to_thread(compressor.compress, data, final)
+        return compressor.compress(data, final)
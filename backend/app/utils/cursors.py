@@ -0,0 +1,20 @@
+import base64
+import json
+from datetime import datetime
+
+# Opaque pagination cursors. Clients pass them back verbatim; the encoding
+# is an implementation detail and may change.
+
+def encode_cursor(timestamp) -> str:
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    raw = json.dumps({"ts": timestamp}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str) -> datetime:
+    """Raises ValueError for malformed tokens."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        return datetime.fromisoformat(json.loads(raw)["ts"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
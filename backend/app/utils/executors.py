@@ -0,0 +1,205 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+from app.utils import metrics
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a BoundedExecutor's workers and wait queue are all in use."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} executor is saturated")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class ExecutorTimeout(Exception):
+    """Raised when a task waited longer than the executor's timeout."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} task timed out")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class ExecutorStats:
+    """Per-executor counters and timings (seconds) for completed calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.wait_seconds = 0.0 # Time spent queued before a worker picked the task up
+        self.run_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    def observe(self, wait: float, run: float):
+        self.calls += 1
+        self.wait_seconds += wait
+        self.run_seconds += run
+        if run > self.max_run_seconds:
+            self.max_run_seconds = run
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "avg_wait_seconds": self.wait_seconds / self.calls if self.calls else 0.0,
+            "avg_run_seconds": self.run_seconds / self.calls if self.calls else 0.0,
+            "max_run_seconds": self.max_run_seconds,
+        }
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may actually use. os.cpu_count() reports the host's
+    CPUs, which in a container can be far more than the affinity mask or
+    the cgroup CPU quota allow.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError: # Not available on macOS/Windows
+        cpus = os.cpu_count() or 1
+    try:
+        # cgroup v2: "<quota> <period>", or "max <period>" when unlimited
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(int(quota) // int(period), 1))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def _timed(fn: Callable, *args):
+    # Runs inside the worker; wall-clock start/end let the caller split the
+    # total latency into queue wait and run time.
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+
+def _timed_collecting(fn: Callable, *args):
+    # Process workers can't record into the parent's metrics, so whatever fn
+    # records is returned with the result and merged by the caller.
+    with metrics.collecting() as batch:
+        result, started, finished = _timed(fn, *args)
+    return result, started, finished, batch
+
+
+class BoundedExecutor:
+    """
+    Runs blocking or CPU-bound callables off the event loop with admission control.
+
+    kind is "process" (ProcessPoolExecutor), "thread" (ThreadPoolExecutor) or
+    "inline" (call directly on the loop, for debugging). At most
+    max_workers + max_queue tasks may be in flight; anything beyond that is
+    rejected immediately with ExecutorSaturated instead of queueing without bound.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int = 0, max_queue: int = 0,
+                 timeout: Optional[float] = None, retry_after: int = 1,
+                 initializer: Optional[Callable] = None, start_method: Optional[str] = None):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers or available_cpus()
+        self.max_queue = max_queue
+        self.timeout = timeout or None
+        self.retry_after = retry_after
+        self.initializer = initializer
+        self.start_method = start_method
+        self.in_flight = 0
+        self.stats = ExecutorStats()
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        metrics.register_executor(self)
+
+    @property
+    def crosses_process(self) -> bool:
+        """Arguments and results are pickled, so open files can't be passed."""
+        return self.kind == "process"
+
+    def start(self) -> Optional[Executor]:
+        with self._lock:
+            if self._executor is None and self.kind != "inline":
+                if self.kind == "process":
+                    context = multiprocessing.get_context(self.start_method) if self.start_method else None
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers, mp_context=context, initializer=self.initializer
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=self.name, initializer=self.initializer
+                    )
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    async def run(self, fn: Callable, *args, stage: Optional[str] = None):
+        """
+        Runs fn(*args) on a worker. With stage set, the time fn spent running
+        (excluding queue wait) is recorded as that metrics stage.
+        """
+        if self.kind == "inline":
+            started = time.time()
+            try:
+                return fn(*args)
+            finally:
+                run = time.time() - started
+                self.stats.observe(0.0, run)
+                if stage:
+                    metrics.STAGE_SECONDS.observe(run, stage)
+
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.stats.rejected += 1
+            raise ExecutorSaturated(self.name, self.retry_after)
+
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        submitted = time.time()
+        try:
+            task = _timed_collecting if self.crosses_process else _timed
+            future = self.start().submit(task, fn, *args)
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        # Release the slot when the work itself finishes, not when the caller
+        # stops waiting, so timed-out tasks still count against capacity.
+        future.add_done_callback(lambda _: self._release_from(loop))
+
+        try:
+            outcome = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise ExecutorTimeout(self.name, self.retry_after)
+        except Exception:
+            self.stats.errors += 1
+            raise
+        result, started, finished = outcome[:3]
+        if self.crosses_process:
+            metrics.merge(outcome[3])
+        self.stats.observe(max(started - submitted, 0.0), finished - started)
+        if stage:
+            metrics.STAGE_SECONDS.observe(finished - started, stage)
+        return result
+
+    def _release_from(self, loop: asyncio.AbstractEventLoop):
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # Loop already closed (shutdown), nothing left to account for
+            pass
+
+    def _release(self):
+        self.in_flight -= 1
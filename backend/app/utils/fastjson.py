@@ -0,0 +1,28 @@
+import json
+from typing import Any
+from fastapi.responses import Response
+
+# Fast JSON encoding for large responses: orjson when installed (optional,
+# `pip install orjson`), compact stdlib json otherwise.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response serialized with dumps(). Returning it from a route also
+    skips FastAPI's response_model validation, so use it for data the
+    server built itself.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
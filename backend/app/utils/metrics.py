@@ -0,0 +1,236 @@
+import bisect
+import contextlib
+import threading
+import time
+from typing import Callable, Tuple
+
+# Minimal in-process metrics with Prometheus text exposition.
+# Recording is a lock + a few additions; everything else (cache and
+# executor counters) is read only when /metrics is scraped.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_metrics = {} # name -> Counter/Histogram, in registration order
+_collectors = [] # callables yielding (family, type, sample line) at scrape time
+_local = threading.local() # .batch is set while collecting inside a worker process
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        # Unlabelled counters start at 0 so they are exported before the first event
+        self._values = {} if labelnames else {(): 0}
+        self._lock = threading.Lock()
+        _metrics[name] = self
+
+    def inc(self, amount: float = 1, *labels):
+        batch = getattr(_local, "batch", None)
+        if batch is not None:
+            batch.append((self.name, labels, amount))
+            return
+        self._apply(labels, amount)
+
+    def _apply(self, labels: tuple, amount: float):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_format(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {} # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _metrics[name] = self
+
+    def observe(self, value: float, *labels):
+        batch = getattr(_local, "batch", None)
+        if batch is not None:
+            batch.append((self.name, labels, value))
+            return
+        self._apply(labels, value)
+
+    def _apply(self, labels: tuple, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def expose(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [(labels, list(counts)) for labels, counts in self._series.items()]
+        for labels, counts in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_format(counts[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+REQUEST_SECONDS = Histogram(
+    "pharmaguard_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+STAGE_SECONDS = Histogram(
+    "pharmaguard_stage_duration_seconds", "Time spent in each analysis/storage stage.", ("stage",)
+)
+VARIANTS_PARSED = Counter("pharmaguard_variants_parsed_total", "Genotype calls extracted from uploaded VCFs.")
+MODEL_ERRORS = Counter("pharmaguard_model_errors_total", "Model inference calls that failed.")
+
+
+def timed(stage: str):
+    """Context manager recording the block's duration under STAGE_SECONDS{stage}."""
+    return STAGE_SECONDS.time(stage)
+
+
+# --- Worker processes ---
+# Metrics recorded inside a process pool worker would be lost, so the
+# executor wraps each task in collecting() and merges the batch in the parent.
+
+@contextlib.contextmanager
+def collecting():
+    batch = []
+    previous = getattr(_local, "batch", None)
+    _local.batch = batch
+    try:
+        yield batch
+    finally:
+        _local.batch = previous
+
+
+def merge(batch: list):
+    for name, labels, value in batch:
+        metric = _metrics.get(name)
+        if metric is not None:
+            metric._apply(labels, value)
+
+
+# --- Scrape-time collectors ---
+
+def register_collector(collector: Callable):
+    _collectors.append(collector)
+
+
+def register_cache(name: str, cache):
+    """Exposes a TTLCache's hit/miss counters and size."""
+    def collect():
+        labels = f'{{cache="{_escape(name)}"}}'
+        yield "pharmaguard_cache_hits_total", "counter", f"{labels} {cache.hits}"
+        yield "pharmaguard_cache_misses_total", "counter", f"{labels} {cache.misses}"
+        yield "pharmaguard_cache_entries", "gauge", f"{labels} {len(cache)}"
+    register_collector(collect)
+
+
+def register_executor(executor):
+    """Exposes a BoundedExecutor's ExecutorStats and current load."""
+    def collect():
+        labels = f'{{executor="{_escape(executor.name)}"}}'
+        stats = executor.stats
+        yield "pharmaguard_executor_calls_total", "counter", f"{labels} {stats.calls}"
+        yield "pharmaguard_executor_rejected_total", "counter", f"{labels} {stats.rejected}"
+        yield "pharmaguard_executor_timeouts_total", "counter", f"{labels} {stats.timeouts}"
+        yield "pharmaguard_executor_errors_total", "counter", f"{labels} {stats.errors}"
+        yield "pharmaguard_executor_wait_seconds_total", "counter", f"{labels} {_format(stats.wait_seconds)}"
+        yield "pharmaguard_executor_run_seconds_total", "counter", f"{labels} {_format(stats.run_seconds)}"
+        yield "pharmaguard_executor_in_flight", "gauge", f"{labels} {executor.in_flight}"
+    register_collector(collect)
+
+
+def register_admission(control):
+    """Exposes an AdmissionControl's load and rejections."""
+    def collect():
+        labels = f'{{limiter="{_escape(control.name)}"}}'
+        yield "pharmaguard_admission_active", "gauge", f"{labels} {control.active}"
+        yield "pharmaguard_admission_waiting", "gauge", f"{labels} {control.waiting}"
+        for reason, count in control.rejected.items():
+            reason_labels = f'{{limiter="{_escape(control.name)}",reason="{reason}"}}'
+            yield "pharmaguard_admission_rejected_total", "counter", f"{reason_labels} {count}"
+    register_collector(collect)
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in list(_metrics.values()):
+        lines.extend(metric.expose())
+    # Samples of one family must be contiguous under a single TYPE line
+    families = {}
+    for collector in list(_collectors):
+        for family, kind, sample in collector():
+            families.setdefault((family, kind), []).append(family + sample)
+    for (family, kind), samples in families.items():
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request into REQUEST_SECONDS, labelled
+    by the matched route template (not the raw path) to bound cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], path, str(status[0]))
@@ -0,0 +1,60 @@
+import os
+import signal
+import threading
+from typing import Optional
+
+# Memory of the current process, for recycling pre-forked server workers.
+# Pages a worker still shares copy-on-write with its parent (the preloaded
+# model and tables) are not its own, so private memory is what is measured.
+
+
+def private_memory_bytes() -> Optional[int]:
+    """
+    Memory only this process holds (Private_Clean + Private_Dirty), falling
+    back to the resident set size. None where /proc isn't available.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            total = 0
+            for line in f:
+                if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                    total += int(line.split()[1]) * 1024
+            return total
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class MemoryWatchdog:
+    """
+    Daemon thread that checks private memory every `interval` seconds and,
+    once it exceeds max_bytes, sends this process SIGTERM: the server stops
+    accepting connections, finishes in-flight requests and exits, and the
+    process manager starts a fresh worker.
+    """
+
+    def __init__(self, max_bytes: int, interval: float):
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def start(self):
+        if private_memory_bytes() is None:
+            print("Worker memory limit disabled: process memory is not readable here")
+            return
+        threading.Thread(target=self._watch, name="memory-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            used = private_memory_bytes()
+            if used is not None and used > self.max_bytes:
+                print(f"Worker {os.getpid()} uses {used // (1024 * 1024)} MB private memory, recycling")
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
@@ -0,0 +1,54 @@
+import json
+import zlib
+
+# Storage encoding for analysis results. Every DrugResult of an analysis
+# normally carries the same detected_variants list, so the encoded form keeps
+# each distinct variant list once ("variant_sets") and has each drug refer to
+# it by index. The whole payload is compact JSON compressed with zlib.
+RESULT_ENCODING = "pgx1+zlib-json"
+
+def encode_result(result_data: dict) -> bytes:
+    """AnalysisResultResponse.model_dump() -> compressed blob."""
+    variant_sets = []
+    set_ids = {}
+    results = []
+    for drug_result in result_data["results"]:
+        drug_result = dict(drug_result)
+        profile = dict(drug_result["pharmacogenomic_profile"])
+        variants = tuple((v["rsid"], v.get("genotype")) for v in profile.pop("detected_variants", []))
+        set_id = set_ids.get(variants)
+        if set_id is None:
+            set_id = set_ids[variants] = len(variant_sets)
+            variant_sets.append(variants)
+        profile["variant_set"] = set_id
+        drug_result["pharmacogenomic_profile"] = profile
+        results.append(drug_result)
+
+    payload = {
+        "patient_id": result_data["patient_id"],
+        "timestamp": result_data["timestamp"],
+        "variant_sets": variant_sets,
+        "results": results,
+    }
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+def decode_result(blob: bytes) -> dict:
+    """Compressed blob -> dict in the AnalysisResultResponse shape."""
+    payload = json.loads(zlib.decompress(blob))
+    variant_lists = [[{"rsid": rsid, "genotype": genotype} for rsid, genotype in variants]
+                     for variants in payload["variant_sets"]]
+    for drug_result in payload["results"]:
+        profile = drug_result["pharmacogenomic_profile"]
+        profile["detected_variants"] = variant_lists[profile.pop("variant_set")]
+    return {
+        "patient_id": payload["patient_id"],
+        "timestamp": payload["timestamp"],
+        "results": payload["results"],
+    }
+
+def load_result_data(record: dict) -> dict:
+    """Result payload of a stored analysis record, in either storage format."""
+    if record.get("result_encoding") == RESULT_ENCODING:
+        return decode_result(bytes(record["result_blob"]))
+    # Records written before the compact encoding existed
+    return record["result_data"]
@@ -1,10 +1,23 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from jose import jwt
 from passlib.context import CryptContext
 from app.config import settings
+from app.utils.executors import BoundedExecutor
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different bcrypt cost are flagged for rehash on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# bcrypt is deliberately slow CPU work (and releases the GIL), so it runs on
+# its own capped pool. Bursts beyond the queue get a fast 503 + Retry-After.
+hash_executor = BoundedExecutor(
+    "password-hash",
+    kind="thread",
+    max_workers=settings.HASH_WORKERS,
+    max_queue=settings.HASH_QUEUE_DEPTH,
+    timeout=settings.HASH_TIMEOUT_SECONDS,
+    retry_after=settings.RETRY_AFTER_SECONDS,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -12,8 +25,21 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+async def hash_password(password: str) -> str:
+    return await hash_executor.run(get_password_hash, password, stage="bcrypt")
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Returns (valid, new_hash). new_hash is set when the stored hash uses
+    outdated settings and should be replaced; the rehash runs in the pool too.
+    """
+    return await hash_executor.run(pwd_context.verify_and_update, plain_password, hashed_password, stage="bcrypt")
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, uid: Optional[str] = None):
     to_encode = data.copy()
+    if uid and settings.JWT_UID_CLAIM:
+        # Lets get_current_user authenticate without a database lookup
+        to_encode["uid"] = uid
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
@@ -0,0 +1,111 @@
+import asyncio
+import gzip
+import mimetypes
+import os
+import re
+from typing import Optional
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from app.utils.compression import COMPRESSIBLE_TYPES, brotli, negotiate
+
+# Serving for the Vite build (frontend/dist). Files are looked up once and
+# then served from memory with their encoded variants, so repeat requests
+# cost neither a stat nor a read nor a compression.
+
+IMMUTABLE = "public, max-age=31536000, immutable" # Content-hashed names never change
+REVALIDATE = "no-cache" # Cacheable, but revalidated with If-None-Match every time
+ASSETS_DIR = "assets" # Vite's build.assetsDir, where every hashed file goes
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8}(\.\w+)+$") # Vite's [name]-[hash].[ext], 8-character hash
+MEMORY_LIMIT = 4 * 1024 * 1024 # Larger files are streamed from disk
+MIN_COMPRESS_SIZE = 1024 # Smaller files aren't worth compressing on the fly
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz")) # Sibling files written by the build, preferred first
+
+
+class StaticFile:
+    """One file and its encoded variants. Bodies are read or compressed on first use."""
+
+    def __init__(self, path: str, cache_control: str):
+        st = os.stat(path)
+        self.path = path
+        self.size = st.st_size
+        self.cache_control = cache_control
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag_base = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+        self.on_disk = {encoding: path + ext for encoding, ext in PRECOMPRESSED if os.path.isfile(path + ext)}
+        self.compressible = self.media_type.startswith(COMPRESSIBLE_TYPES)
+        in_memory = ()
+        if self.compressible and MIN_COMPRESS_SIZE <= self.size <= MEMORY_LIMIT:
+            in_memory = ("br", "gzip") if brotli is not None else ("gzip",)
+        self.encodings = tuple(e for e, _ in PRECOMPRESSED if e in self.on_disk or e in in_memory)
+        self._bodies = {} # encoding ("identity", "br", "gzip") -> bytes
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.etag_base}"' if encoding == "identity" else f'"{self.etag_base}-{encoding}"'
+
+    async def body(self, encoding: str) -> Optional[bytes]:
+        """The encoded body, or None when the file is too large to keep in memory."""
+        if self.size > MEMORY_LIMIT:
+            return None
+        body = self._bodies.get(encoding)
+        if body is None:
+            # Compressing at the highest level is paid once per file
+            body = self._bodies[encoding] = await asyncio.to_thread(self._load, encoding)
+        return body
+
+    def _load(self, encoding: str) -> bytes:
+        with open(self.on_disk.get(encoding, self.path), "rb") as f:
+            data = f.read()
+        if encoding in self.on_disk or encoding == "identity":
+            return data
+        if encoding == "br":
+            return brotli.compress(data, quality=11)
+        return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _is_hashed(rel_path: str) -> bool:
+    # Top-level files (apple-touch-icon.png...) keep their names across deploys
+    directory, name = os.path.split(os.path.normpath(rel_path))
+    return directory == ASSETS_DIR and HASHED_NAME.search(name) is not None
+
+
+class StaticBundle:
+    def __init__(self, directory: str):
+        self.directory = os.path.realpath(directory)
+        self._files = {} # relative path -> StaticFile
+        # Plain files at the top of the build (favicon, robots.txt...); every
+        # other top-level path is a client-side route served index.html
+        try:
+            self.root_files = {name for name in os.listdir(self.directory)
+                               if os.path.isfile(os.path.join(self.directory, name))}
+        except OSError:
+            print(f"Frontend build not found at {self.directory}")
+            self.root_files = set()
+
+    def lookup(self, rel_path: str) -> Optional[StaticFile]:
+        static_file = self._files.get(rel_path)
+        if static_file is None:
+            path = os.path.realpath(os.path.join(self.directory, rel_path))
+            if not path.startswith(self.directory + os.sep) or not os.path.isfile(path):
+                return None
+            cache_control = IMMUTABLE if _is_hashed(rel_path) else REVALIDATE
+            static_file = self._files[rel_path] = StaticFile(path, cache_control)
+        return static_file
+
+    async def serve(self, static_file: Optional[StaticFile], request: Request) -> Response:
+        if static_file is None:
+            return Response(status_code=404, content="Not Found", media_type="text/plain")
+        encoding = negotiate(request.headers.get("accept-encoding", ""), static_file.encodings) or "identity"
+        etag = static_file.etag(encoding)
+        headers = {"ETag": etag, "Cache-Control": static_file.cache_control}
+        if static_file.encodings:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+
+        body = await static_file.body(encoding)
+        if body is None:
+            path = static_file.on_disk.get(encoding, static_file.path)
+            return FileResponse(path, media_type=static_file.media_type, headers=headers)
+        return Response(content=body, media_type=static_file.media_type, headers=headers)
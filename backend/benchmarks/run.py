@@ -0,0 +1,305 @@
+"""
+Benchmark suite for the analysis path: VCF parsing, phenotype mapping,
+model prediction and full /api/analyze round trips.
+
+Run from backend/:
+
+    python -m benchmarks.run                    # default sizes
+    python -m benchmarks.run --full             # adds 5M-record inputs
+    python -m benchmarks.run --only parse,e2e   # case name prefixes
+    python -m benchmarks.run --save-baseline    # store results as the baseline
+
+Each case runs in a fresh process so its peak RSS is its own. Results are
+written as JSON and compared against benchmarks/baseline.json when present;
+a throughput drop or RSS growth beyond the tolerances exits non-zero.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_DATA_DIR = os.path.join(BENCH_DIR, ".data")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+SIZES = (1_000, 100_000, 1_000_000)
+FULL_SIZES = SIZES + (5_000_000,)
+COHORT_SIZES = (1_000, 100_000)
+COHORT_SAMPLES = 100
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _best_of(repeat: int, fn) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _load_model(model_dir: str):
+    import training_models
+    if model_dir:
+        # Artifacts outside backend/ (e.g. a locally trained model)
+        training_models.BASE_DIR = model_dir
+        training_models.model.__init__(risk_table=training_models.settings.PGX_RISK_TABLE)
+    # Loading is lazy; keep it out of the timed runs
+    training_models.model.load()
+    return training_models
+
+
+# --- Cases (run inside a fresh worker process) ---
+
+def bench_parse(path: str, records: int, samples: int, targeted: bool, repeat: int, **_) -> dict:
+    from pgx_loci import PGX_TARGETS
+    from vcf_parser import DEFAULT_CHUNK_SIZE, parse_vcf_cohort_stream, parse_vcf_stream
+
+    targets = PGX_TARGETS if targeted else None
+    parse = parse_vcf_stream if samples == 1 else parse_vcf_cohort_stream
+
+    def run():
+        with open(path, "rb") as file_obj:
+            parse(file_obj, DEFAULT_CHUNK_SIZE, targets)
+
+    seconds = _best_of(repeat, run)
+    return {
+        "seconds": seconds,
+        "ops": records,
+        "unit": "records",
+        "mb_per_sec": os.path.getsize(path) / seconds / 1e6,
+    }
+
+
+def bench_phenotypes(patients: int, repeat: int, model_dir: str = "", **_) -> dict:
+    from benchmarks.synthetic import random_genotypes
+    training_models = _load_model(model_dir)
+    rng = random.Random(0)
+    genotypes = [random_genotypes(rng) for _ in range(patients)]
+
+    def run():
+        for g in genotypes:
+            training_models.model.map_genotypes_to_phenotypes(g)
+
+    return {"seconds": _best_of(repeat, run), "ops": patients, "unit": "patients"}
+
+
+def bench_predict(patients: int, batched: bool, repeat: int, model_dir: str = "", **_) -> dict:
+    from benchmarks.synthetic import random_genotypes
+    training_models = _load_model(model_dir)
+    model = training_models.model
+    drugs = list(training_models.DRUG_GENE_MAP)
+    rng = random.Random(0)
+    genotypes = [random_genotypes(rng) for _ in range(patients)]
+
+    def run():
+        for g in genotypes:
+            if batched:
+                model.predict_batch(g, drugs)
+            else:
+                for drug in drugs:
+                    model.predict(g, drug)
+
+    return {
+        "seconds": _best_of(repeat, run),
+        "ops": patients,
+        "unit": "patients",
+        "drugs": len(drugs),
+        "model_available": model.status()["model_available"],
+    }
+
+
+def bench_e2e(path: str, requests: int, model_dir: str = "", **_) -> dict:
+    # In-process app with in-memory storage and caches off, so every request
+    # pays for parse + predict + persist.
+    os.environ["STORAGE_BACKEND"] = "memory"
+    os.environ["GENOTYPE_CACHE_SIZE"] = "0"
+    os.environ["PREDICTION_CACHE_SIZE"] = "0"
+    os.environ["RESULT_CACHE_SIZE"] = "0"
+    os.environ.setdefault("ANALYSIS_EXECUTOR", "thread")
+    import asyncio
+    import httpx
+    _load_model(model_dir)
+    from app.main import app
+
+    with open(path, "rb") as f:
+        content = f.read()
+    file_name = os.path.basename(path)
+    drugs = "CLOPIDOGREL,WARFARIN,CODEINE,SIMVASTATIN,AZATHIOPRINE,FLUOROURACIL"
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            user = {"email": "bench@example.com", "password": "benchmark", "username": "bench",
+                    "fullName": "Bench", "hospital": "Bench", "gender": "x"}
+            r = await client.post("/api/signup", json=user)
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+            latencies = []
+            started = time.perf_counter()
+            for _ in range(requests):
+                t = time.perf_counter()
+                r = await client.post(
+                    "/api/analyze", headers=headers,
+                    files={"vcfFile": (file_name, content)}, data={"selectedDrugs": drugs},
+                )
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - t)
+            return time.perf_counter() - started, sorted(latencies)
+
+    seconds, latencies = asyncio.run(run())
+    return {
+        "seconds": seconds,
+        "ops": requests,
+        "unit": "requests",
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000,
+        "executor": os.environ["ANALYSIS_EXECUTOR"],
+    }
+
+
+CASES = {
+    "parse": bench_parse,
+    "phenotypes": bench_phenotypes,
+    "predict": bench_predict,
+    "e2e": bench_e2e,
+}
+
+
+def _run_case(kind: str, params: dict) -> dict:
+    os.chdir(BACKEND_DIR)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    result = CASES[kind](**params)
+    result["ops_per_sec"] = result["ops"] / result["seconds"]
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def build_cases(args) -> list:
+    """(name, kind, params) for every case selected by the command line."""
+    from benchmarks.synthetic import ensure_vcf
+
+    sizes = FULL_SIZES if args.full else SIZES
+    common = {"repeat": args.repeat, "model_dir": args.model_dir}
+    cases = []
+    for records in sizes:
+        for compressed in (False, True):
+            kind = "gz" if compressed else "plain"
+            cases.append((f"parse/{records}r/1s/{kind}/targeted", "parse", lambda r=records, c=compressed: dict(
+                common, path=ensure_vcf(args.data_dir, r, 1, c), records=r, samples=1, targeted=True)))
+        cases.append((f"parse/{records}r/1s/plain/full", "parse", lambda r=records: dict(
+            common, path=ensure_vcf(args.data_dir, r), records=r, samples=1, targeted=False)))
+    for records in COHORT_SIZES:
+        for compressed in (False, True):
+            kind = "gz" if compressed else "plain"
+            cases.append((f"parse/{records}r/{args.samples}s/{kind}/targeted", "parse", lambda r=records, c=compressed: dict(
+                common, path=ensure_vcf(args.data_dir, r, args.samples, c), records=r, samples=args.samples, targeted=True)))
+    cases.append(("phenotypes/10000p", "phenotypes", lambda: dict(common, patients=10_000)))
+    cases.append(("predict/1000p/per_drug", "predict", lambda: dict(common, patients=1_000, batched=False)))
+    cases.append(("predict/1000p/batch", "predict", lambda: dict(common, patients=1_000, batched=True)))
+    for records in (1_000, 100_000):
+        cases.append((f"e2e/{records}r/gz", "e2e", lambda r=records: dict(
+            path=ensure_vcf(args.data_dir, r, 1, True), requests=args.requests, model_dir=args.model_dir)))
+
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(","))
+        cases = [case for case in cases if case[0].startswith(prefixes)]
+    return cases
+
+
+def compare(results: dict, baseline: dict, throughput_tolerance: float, rss_tolerance: float) -> list:
+    """Human-readable regressions of results against baseline."""
+    regressions = []
+    for name, current in results["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            continue
+        if current["ops_per_sec"] < base["ops_per_sec"] * (1 - throughput_tolerance):
+            regressions.append(
+                f"{name}: throughput {current['ops_per_sec']:.1f} {current['unit']}/s "
+                f"vs baseline {base['ops_per_sec']:.1f} ({current['ops_per_sec'] / base['ops_per_sec'] - 1:+.1%})"
+            )
+        if current["peak_rss_mb"] > base["peak_rss_mb"] * (1 + rss_tolerance):
+            regressions.append(
+                f"{name}: peak RSS {current['peak_rss_mb']:.1f} MB "
+                f"vs baseline {base['peak_rss_mb']:.1f} MB ({current['peak_rss_mb'] / base['peak_rss_mb'] - 1:+.1%})"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PharmaGuard benchmark suite")
+    parser.add_argument("--full", action="store_true", help="Include 5M-record inputs")
+    parser.add_argument("--only", default="", help="Comma-separated case name prefixes, e.g. parse,e2e")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest is reported")
+    parser.add_argument("--samples", type=int, default=COHORT_SAMPLES, help="Sample columns in cohort VCFs")
+    parser.add_argument("--requests", type=int, default=20, help="/api/analyze calls per e2e case")
+    parser.add_argument("--model-dir", default="", help="Directory with model artifacts (default: backend/)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Where generated VCFs are cached")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Also write results to --baseline")
+    parser.add_argument("--throughput-tolerance", type=float, default=0.10)
+    parser.add_argument("--rss-tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    results = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "cases": {},
+    }
+
+    context = multiprocessing.get_context("spawn")
+    for name, kind, make_params in build_cases(args):
+        params = make_params() # Generates input files on first use
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(_run_case, kind, params).result()
+        results["cases"][name] = result
+        print(f"{name:<40} {result['ops_per_sec']:>14,.1f} {result['unit']}/s "
+              f"{result['seconds']:>9.3f}s {result['peak_rss_mb']:>9.1f} MB", flush=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    status = 0
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.throughput_tolerance, args.rss_tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            status = 1
+        else:
+            print(f"No regressions against {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import gzip
+import os
+import random
+from pgx_loci import PGX_LOCI
+
+# Synthetic VCF generators for the benchmark suite. Files are written
+# line by line, so multi-million record inputs never sit in memory.
+
+GENOTYPES = ("0/0", "0/1", "1/1", "0|1", "1|0", "./.")
+BASES = "ACGT"
+
+
+def vcf_name(records: int, samples: int = 1, compressed: bool = False) -> str:
+    return f"synthetic_{records}r_{samples}s.vcf" + (".gz" if compressed else "")
+
+
+def write_vcf(path: str, records: int, samples: int = 1, compressed: bool = False, seed: int = 0) -> str:
+    """
+    Writes a VCF with `records` data lines and `samples` sample columns.
+    Every PGx locus (pgx_loci.PGX_LOCI) is included once, spread through the
+    file, so parsers see realistic hit rates. Returns path.
+    """
+    rng = random.Random(seed)
+    pgx_at = {}
+    for i, locus in enumerate(PGX_LOCI):
+        # Evenly spaced so targeted chunk skipping is exercised between hits
+        pgx_at[(i + 1) * records // (len(PGX_LOCI) + 1)] = locus
+    sample_names = "\t".join(f"SAMPLE_{i + 1}" for i in range(samples))
+
+    opener = gzip.open if compressed else open
+    with opener(path, "wt", newline="\n") as out:
+        out.write("##fileformat=VCFv4.2\n")
+        out.write("##source=pharmaguard-benchmarks\n")
+        out.write('##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">\n')
+        out.write('##FORMAT=<ID=DP,Number=1,Type=Integer,Description="Read depth">\n')
+        out.write(f"#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\t{sample_names}\n")
+        lines = []
+        for i in range(records):
+            locus = pgx_at.get(i)
+            if locus is not None:
+                chrom, pos, rsid = f"chr{locus.chrom}", locus.pos_grch38, locus.rsid
+            else:
+                chrom, pos, rsid = "chr1", 10_000 + i * 10, f"rs{100_000_000 + i}"
+            ref = rng.choice(BASES)
+            alt = BASES[(BASES.index(ref) + rng.randint(1, 3)) % 4]
+            calls = "\t".join(f"{rng.choice(GENOTYPES)}:{rng.randint(5, 60)}" for _ in range(samples))
+            lines.append(f"{chrom}\t{pos}\t{rsid}\t{ref}\t{alt}\t50\tPASS\tDP=30\tGT:DP\t{calls}\n")
+            if len(lines) >= 10_000:
+                out.write("".join(lines))
+                lines = []
+        out.write("".join(lines))
+    return path
+
+
+def ensure_vcf(data_dir: str, records: int, samples: int = 1, compressed: bool = False) -> str:
+    """Path of a cached synthetic VCF in data_dir, generating it on first use."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, vcf_name(records, samples, compressed))
+    if not os.path.exists(path):
+        # Write to a temp name so an interrupted run doesn't leave a partial file
+        write_vcf(path + ".part", records, samples, compressed)
+        os.replace(path + ".part", path)
+    return path
+
+
+def random_genotypes(rng: random.Random) -> dict:
+    """An rsID -> Genotype map over the PGx loci, as parse_vcf returns."""
+    genotypes = {}
+    for locus in PGX_LOCI:
+        if rng.random() < 0.8:
+            genotypes[locus.rsid] = rng.choice(BASES) + rng.choice(BASES)
+    return genotypes
@@ -0,0 +1,62 @@
+"""
+Production server: pre-forked uvicorn workers sharing one preloaded model.
+
+    gunicorn app.main:app
+
+Runs SERVER_WORKERS workers, one by default. Background jobs, /metrics
+and the /api/analyze admission limits are kept in each worker's memory,
+so with several workers a job is only visible from the worker that
+created it, /metrics shows one worker, and the admission limits apply per
+worker. Only raise SERVER_WORKERS behind sticky routing and with the
+limits divided accordingly.
+
+With more than one worker, the app, model, feature index, risk table and
+allele/phenotype tables are loaded once in the parent before it forks, and
+the workers share those pages copy-on-write. Workers are restarted
+gracefully (in-flight requests finish) after WORKER_MAX_REQUESTS requests
+or once their private memory exceeds WORKER_MAX_MEMORY_MB.
+"""
+import gc
+import os
+from app.config import settings
+
+workers = max(settings.SERVER_WORKERS, 1)
+if workers > 1:
+    # Each worker is its own process, so analyses run on threads inside it
+    # rather than in a per-worker process pool that would reload the model.
+    # Explicit settings win.
+    for name, value in (("ANALYSIS_EXECUTOR", "thread"), ("ANALYSIS_WORKERS", 2)):
+        if name not in settings.model_fields_set:
+            setattr(settings, name, value)
+    # Workers already use every core, and an OpenMP thread pool started in
+    # the parent (by xgboost during preload) doesn't survive fork.
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+max_requests = settings.WORKER_MAX_REQUESTS
+max_requests_jitter = settings.WORKER_MAX_REQUESTS // 10 # Workers don't all restart at once
+graceful_timeout = 30
+timeout = 120
+accesslog = "-"
+
+
+def when_ready(server):
+    # Runs in the parent after the app is imported, before any worker forks.
+    # A process pool loads the model in its own workers, so there is nothing to share.
+    if settings.ANALYSIS_EXECUTOR == "process":
+        return
+    from app.services.warmup import preload
+    from training_models import model
+    preload()
+    print(f"Preloaded model {model.status()['version']} for {server.cfg.workers} workers")
+    # Move everything allocated so far out of the collector's reach, so GC
+    # passes in the workers don't write to (and un-share) these pages
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    if settings.WORKER_MAX_MEMORY_MB:
+        from app.utils.process_memory import MemoryWatchdog
+        MemoryWatchdog(settings.WORKER_MAX_MEMORY_MB * 1024 * 1024, settings.WORKER_MEMORY_CHECK_SECONDS).start()
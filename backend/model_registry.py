@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+from typing import Optional
+from app.config import settings
+
+# Versioned model artifacts, one directory per version:
+#
+#     models/
+#         ACTIVE              name of the version to serve
+#         <version>/
+#             model.ubj       XGBoost native model (or model.pkl, pickled)
+#             labels.json     risk label per class (or label_encoder.pkl)
+#             features.json   feature names the model was trained on
+#             metadata.json   optional, free-form (training metrics, data hash...)
+#
+# Version directories are immutable once written; shipping a model means
+# adding a directory and pointing ACTIVE at it. Without an ACTIVE file the
+# legacy artifacts next to training_models.py are served.
+
+ACTIVE_FILE = "ACTIVE"
+FEATURES_FILE = "features.json"
+METADATA_FILE = "metadata.json"
+# (model, labels) file names per format
+ARTIFACT_FILES = {
+    "native": ("model.ubj", "labels.json"),
+    "pickle": ("model.pkl", "label_encoder.pkl"),
+}
+
+
+class ModelValidationError(Exception):
+    """Raised when a model version can't be loaded or doesn't match the expected features."""
+
+
+class ModelArtifacts:
+    """The files making up one model version."""
+
+    def __init__(self, version: Optional[str], model_path: str, labels_path: str, model_format: str,
+                 features_path: Optional[str] = None):
+        self.model_path = model_path
+        self.labels_path = labels_path
+        self.format = model_format
+        self.features_path = features_path
+        self.stamp = self._stat()
+        # Legacy artifacts have no name; they are versioned by their file stamps
+        self.version = version or self._version_of(self.stamp)
+
+    def _stat(self):
+        paths = [self.model_path, self.labels_path] + ([self.features_path] if self.features_path else [])
+        try:
+            return tuple((st.st_mtime_ns, st.st_size) for st in (os.stat(path) for path in paths))
+        except OSError:
+            return None
+
+    @staticmethod
+    def _version_of(stamp) -> str:
+        if stamp is None:
+            return "unavailable"
+        return hashlib.sha256(repr(stamp).encode()).hexdigest()[:12]
+
+    def features(self) -> Optional[list]:
+        """The recorded feature schema, or None for legacy artifacts."""
+        if not self.features_path:
+            return None
+        try:
+            with open(self.features_path) as f:
+                return [str(name) for name in json.load(f)]
+        except (OSError, ValueError) as e:
+            raise ModelValidationError(f"Unreadable {FEATURES_FILE}: {e}")
+
+
+def _pick_format(directory: str, files: dict) -> str:
+    """Format to load from directory per PGX_MODEL_FORMAT: auto prefers native when present."""
+    model_format = settings.PGX_MODEL_FORMAT
+    if model_format in ("native", "pickle"):
+        return model_format
+    native = [os.path.join(directory, name) for name in files["native"]]
+    return "native" if all(os.path.exists(path) for path in native) else "pickle"
+
+
+def valid_version(version: str) -> bool:
+    """
+    A plain directory name: no path separators, and no leading dot, which
+    also rules out ".", ".." and the temporary names used while writing.
+    """
+    return bool(version) and not version.startswith(".") and os.path.basename(version) == version
+
+
+def _check_version(version: str):
+    if not valid_version(version):
+        raise ModelValidationError(f"Invalid model version name: {version!r}")
+
+
+class ModelRegistry:
+    def __init__(self, root: str, legacy_dir: str, legacy_files: dict):
+        self.root = root
+        self.legacy_dir = legacy_dir
+        self.legacy_files = legacy_files # format -> (model, labels) names in legacy_dir
+
+    def active_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE)) as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+        return version if valid_version(version) else None
+
+    def versions(self) -> list:
+        """Every version directory with its metadata, newest first."""
+        try:
+            names = [name for name in os.listdir(self.root)
+                     if valid_version(name) and os.path.isdir(os.path.join(self.root, name))]
+        except OSError:
+            return []
+        active = self.active_version()
+        versions = []
+        for name in names:
+            directory = os.path.join(self.root, name)
+            metadata = {}
+            try:
+                with open(os.path.join(directory, METADATA_FILE)) as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                pass
+            versions.append({
+                "version": name,
+                "active": name == active,
+                "format": _pick_format(directory, ARTIFACT_FILES),
+                "created": os.stat(directory).st_mtime,
+                "metadata": metadata,
+            })
+        versions.sort(key=lambda v: v["created"], reverse=True)
+        return versions
+
+    def has_version(self, version: str) -> bool:
+        return valid_version(version) and os.path.isdir(os.path.join(self.root, version))
+
+    def artifacts(self, version: Optional[str] = None) -> ModelArtifacts:
+        """
+        Artifacts of version, or of the active one (legacy files when nothing is
+        active). Raises ModelValidationError for an invalid version name.
+        """
+        if version is not None:
+            _check_version(version)
+        version = version or self.active_version()
+        if version is None:
+            model_format = _pick_format(self.legacy_dir, self.legacy_files)
+            model_file, labels_file = self.legacy_files[model_format]
+            return ModelArtifacts(None, os.path.join(self.legacy_dir, model_file),
+                                  os.path.join(self.legacy_dir, labels_file), model_format)
+        directory = os.path.join(self.root, version)
+        model_format = _pick_format(directory, ARTIFACT_FILES)
+        model_file, labels_file = ARTIFACT_FILES[model_format]
+        return ModelArtifacts(version, os.path.join(directory, model_file), os.path.join(directory, labels_file),
+                              model_format, os.path.join(directory, FEATURES_FILE))
+
+    def set_active(self, version: str):
+        """Points ACTIVE at version. The rename is atomic, so readers never see a partial name."""
+        _check_version(version)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f".{ACTIVE_FILE}.{os.getpid()}")
+        with open(tmp_path, "w") as f:
+            f.write(version + "\n")
+        os.replace(tmp_path, os.path.join(self.root, ACTIVE_FILE))
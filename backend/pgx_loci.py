@@ -0,0 +1,188 @@
+from typing import NamedTuple, Optional
+
+class PgxLocus(NamedTuple):
+    rsid: str
+    gene: str
+    allele: str # Star allele it is best known for
+    variant: str # Variant base on the + strand, as VCF ALT reports it
+    chrom: str
+    pos_grch38: int # 1-based
+    pos_grch37: int # 1-based
+
+class StarAllele(NamedTuple):
+    gene: str
+    name: str
+    function: str # normal | increased | decreased | no
+    activity: float # Contribution to the gene's activity score
+    variants: tuple # rsIDs that must all carry their variant base
+    in_cis: tuple = () # rsIDs also on this haplotype, consumed when present
+
+class GenePhenotypes(NamedTuple):
+    reference: str # Allele assumed when no defining variant is seen
+    reference_activity: float
+    phenotypes: tuple # (highest activity score, phenotype), ascending
+
+# Allele-definition tables, consumed by star_alleles.StarAlleleEngine.
+# Single-nucleotide definitions from PharmVar/CPIC; coordinates for both
+# assemblies so indexed lookups work on either build.
+PGX_LOCI = (
+    PgxLocus("rs4244285", "CYP2C19", "*2", "A", "10", 94781859, 96541616),
+    PgxLocus("rs4986893", "CYP2C19", "*3", "A", "10", 94780653, 96540410),
+    PgxLocus("rs28399504", "CYP2C19", "*4", "G", "10", 94762706, 96522463),
+    PgxLocus("rs12248560", "CYP2C19", "*17", "T", "10", 94761900, 96521657),
+    PgxLocus("rs3892097", "CYP2D6", "*4", "T", "22", 42128945, 42524947),
+    PgxLocus("rs1065852", "CYP2D6", "*10", "A", "22", 42130692, 42526694),
+    PgxLocus("rs28371725", "CYP2D6", "*41", "T", "22", 42127803, 42523805),
+    PgxLocus("rs1799853", "CYP2C9", "*2", "T", "10", 94942290, 96702047),
+    PgxLocus("rs1057910", "CYP2C9", "*3", "C", "10", 94981296, 96741053),
+    PgxLocus("rs4149056", "SLCO1B1", "*5", "C", "12", 21178615, 21331549),
+    PgxLocus("rs1800462", "TPMT", "*2", "G", "6", 18143724, 18143955),
+    PgxLocus("rs1800460", "TPMT", "*3B", "T", "6", 18138997, 18139228),
+    PgxLocus("rs1142345", "TPMT", "*3C", "C", "6", 18130687, 18130918),
+    PgxLocus("rs3918290", "DPYD", "*2A", "T", "1", 97450058, 97915614),
+    PgxLocus("rs55886062", "DPYD", "*13", "C", "1", 97515787, 97981343),
+    PgxLocus("rs67376798", "DPYD", "c.2846A>T", "A", "1", 97082391, 97547947),
+    PgxLocus("rs75017182", "DPYD", "HapB3", "C", "1", 97579893, 98045449),
+)
+
+STAR_ALLELES = (
+    StarAllele("CYP2C19", "*2", "no", 0.0, ("rs4244285",)),
+    StarAllele("CYP2C19", "*3", "no", 0.0, ("rs4986893",)),
+    StarAllele("CYP2C19", "*4", "no", 0.0, ("rs28399504",)),
+    StarAllele("CYP2C19", "*17", "increased", 1.5, ("rs12248560",)),
+    # 100C>T (rs1065852) also sits on *4, so it only means *10 on its own
+    StarAllele("CYP2D6", "*4", "no", 0.0, ("rs3892097",), ("rs1065852",)),
+    StarAllele("CYP2D6", "*10", "decreased", 0.25, ("rs1065852",)),
+    StarAllele("CYP2D6", "*41", "decreased", 0.5, ("rs28371725",)),
+    StarAllele("CYP2C9", "*2", "decreased", 0.5, ("rs1799853",)),
+    StarAllele("CYP2C9", "*3", "no", 0.0, ("rs1057910",)),
+    StarAllele("SLCO1B1", "*5", "no", 0.0, ("rs4149056",)),
+    StarAllele("TPMT", "*2", "no", 0.0, ("rs1800462",)),
+    StarAllele("TPMT", "*3A", "no", 0.0, ("rs1800460", "rs1142345")),
+    StarAllele("TPMT", "*3B", "no", 0.0, ("rs1800460",)),
+    StarAllele("TPMT", "*3C", "no", 0.0, ("rs1142345",)),
+    StarAllele("DPYD", "*2A", "no", 0.0, ("rs3918290",)),
+    StarAllele("DPYD", "*13", "no", 0.0, ("rs55886062",)),
+    StarAllele("DPYD", "c.2846A>T", "decreased", 0.5, ("rs67376798",)),
+    StarAllele("DPYD", "HapB3", "decreased", 0.5, ("rs75017182",)),
+)
+
+# Phenotype codes match the model's features (e.g. CYP2C19_PM)
+_FUNCTION_PHENOTYPES = ((0.5, "PM"), (1.5, "IM"), (float("inf"), "NM"))
+GENE_PHENOTYPES = {
+    "CYP2C19": GenePhenotypes("*1", 1.0, ((0.0, "PM"), (1.5, "IM"), (2.0, "NM"), (2.5, "RM"), (float("inf"), "URM"))),
+    "CYP2D6": GenePhenotypes("*1", 1.0, ((0.0, "PM"), (1.0, "IM"), (2.25, "NM"), (float("inf"), "URM"))),
+    "CYP2C9": GenePhenotypes("*1", 1.0, ((0.5, "PM"), (1.5, "IM"), (float("inf"), "NM"))),
+    "SLCO1B1": GenePhenotypes("*1", 1.0, _FUNCTION_PHENOTYPES),
+    "TPMT": GenePhenotypes("*1", 1.0, _FUNCTION_PHENOTYPES),
+    "DPYD": GenePhenotypes("*1", 1.0, _FUNCTION_PHENOTYPES),
+}
+
+
+def normalize_chrom(chrom: str) -> str:
+    """'chr10', 'Chr10' and '10' all refer to the same contig."""
+    if chrom[:3].lower() == "chr":
+        chrom = chrom[3:]
+    return chrom.upper()
+
+
+ASSEMBLIES = ("GRCh38", "GRCh37")
+
+# Reference names as they appear in ##reference lines and contig assembly= fields
+_ASSEMBLY_NAMES = (
+    (b"grch38", "GRCh38"), (b"hg38", "GRCh38"), (b"hs38", "GRCh38"),
+    (b"grch37", "GRCh37"), (b"hg19", "GRCh37"), (b"hs37", "GRCh37"), (b"g1k_v37", "GRCh37"), (b"b37", "GRCh37"),
+)
+# Lengths of the contigs the loci sit on, which differ between builds
+_CONTIG_LENGTHS = {
+    (b"1", b"248956422"): "GRCh38", (b"1", b"249250621"): "GRCh37",
+    (b"6", b"170805979"): "GRCh38", (b"6", b"171115067"): "GRCh37",
+    (b"10", b"133797422"): "GRCh38", (b"10", b"135534747"): "GRCh37",
+    (b"12", b"133275309"): "GRCh38", (b"12", b"133851895"): "GRCh37",
+    (b"22", b"50818468"): "GRCh38", (b"22", b"51304566"): "GRCh37",
+}
+
+
+def _header_field(line: bytes, name: bytes) -> Optional[bytes]:
+    start = line.find(name + b"=")
+    if start < 0:
+        return None
+    start += len(name) + 1
+    end = len(line)
+    for sep in (b",", b">"):
+        found = line.find(sep, start)
+        if 0 <= found < end:
+            end = found
+    return line[start:end]
+
+
+def detect_assembly(line: bytes) -> Optional[str]:
+    """GRCh38/GRCh37 from a ##reference or ##contig header line, or None."""
+    lower = line.lower().rstrip()
+    if lower.startswith(b"##reference="):
+        names = lower
+    elif lower.startswith(b"##contig="):
+        names = _header_field(lower, b"assembly") or b""
+    else:
+        return None
+    for name, assembly in _ASSEMBLY_NAMES:
+        if name in names:
+            return assembly
+    if lower.startswith(b"##contig="):
+        contig, length = _header_field(lower, b"id"), _header_field(lower, b"length")
+        if contig is not None and length is not None:
+            if contig[:3] == b"chr":
+                contig = contig[3:]
+            return _CONTIG_LENGTHS.get((contig.upper(), length))
+    return None
+
+
+class LocusTargets:
+    """
+    Precomputed lookup sets for a group of loci, in the byte form the VCF
+    parser compares against so no decoding is needed to reject a line.
+    """
+
+    def __init__(self, loci=PGX_LOCI):
+        self.loci = tuple(loci)
+        self.rsids = frozenset(locus.rsid.encode() for locus in self.loci)
+        # assembly -> {(normalized chrom, pos) -> locus}, used for records without an rsID
+        self.positions = {assembly: {} for assembly in ASSEMBLIES}
+        for locus in self.loci:
+            for assembly, pos in zip(ASSEMBLIES, (locus.pos_grch38, locus.pos_grch37)):
+                self.positions[assembly][(locus.chrom.encode(), str(pos).encode())] = locus
+        # Substrings at least one target line must contain; lets the parser
+        # skip whole chunks with a handful of C-level searches.
+        self.needles = tuple(self.rsids) + tuple(
+            b"\t" + pos + b"\t" for positions in self.positions.values() for _, pos in positions
+        )
+
+    def match(self, chrom: bytes, pos: bytes, rsid: bytes, alt: bytes = b"",
+              assembly: Optional[str] = None) -> Optional[str]:
+        """
+        The target rsID of a record. Records without an rsID match by
+        position on the file's assembly (both when it is unknown), and only
+        if ALT carries the locus's variant base, so an unrelated variant at
+        the other build's coordinate is never taken for a PGx locus.
+        """
+        if rsid in self.rsids:
+            return rsid.decode()
+        if rsid == b".":
+            if chrom[:3].lower() == b"chr":
+                chrom = chrom[3:]
+            key = (chrom.upper(), pos)
+            for build in (assembly,) if assembly else ASSEMBLIES:
+                locus = self.positions[build].get(key)
+                if locus is not None and locus.variant.encode() in alt.split(b","):
+                    return locus.rsid
+        return None
+
+    def regions(self, assembly: Optional[str] = None):
+        """(chrom, 0-based start, end) for every locus on the assembly (both when unknown)."""
+        for locus in self.loci:
+            for build, pos in zip(ASSEMBLIES, (locus.pos_grch38, locus.pos_grch37)):
+                if assembly is None or build == assembly:
+                    yield locus.chrom, pos - 1, pos
+
+
+PGX_TARGETS = LocusTargets()
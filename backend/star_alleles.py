@@ -0,0 +1,99 @@
+import re
+from typing import NamedTuple
+from pgx_loci import GENE_PHENOTYPES, PGX_LOCI, STAR_ALLELES
+
+
+class GeneCall(NamedTuple):
+    diplotype: str # e.g. "*1/*2"
+    phenotype: str # e.g. "IM"
+    activity_score: float
+
+
+def _star_order(name: str):
+    # "*2" < "*3A" < "*17" < named haplotypes like "HapB3"
+    match = re.match(r"\*(\d+)(.*)", name)
+    return (int(match.group(1)), match.group(2)) if match else (float("inf"), name)
+
+
+class StarAlleleEngine:
+    """
+    Resolves diplotypes and phenotypes from rsID genotypes using the
+    allele-definition tables in pgx_loci.
+
+    The tables are compiled once into a flat rsID -> (gene, variant base)
+    index, so resolve() makes a single pass over the detected variants
+    whatever the number of genes, then only evaluates the alleles of genes
+    that actually had a variant. Genotypes are unphased: more than two
+    non-reference alleles in a gene are truncated to two.
+    """
+
+    def __init__(self, loci=PGX_LOCI, alleles=STAR_ALLELES, genes=GENE_PHENOTYPES):
+        self.genes = genes
+        self.index = {locus.rsid: (locus.gene, locus.variant) for locus in loci}
+
+        self.alleles = {}
+        for allele in alleles:
+            for rsid in allele.variants + allele.in_cis:
+                if self.index.get(rsid, (None,))[0] != allele.gene:
+                    raise ValueError(f"{allele.gene}{allele.name}: {rsid} is not a {allele.gene} locus")
+            self.alleles.setdefault(allele.gene, []).append(allele)
+        for definitions in self.alleles.values():
+            # Most specific first, so *3A claims its variants before *3B/*3C
+            definitions.sort(key=lambda allele: -len(allele.variants))
+
+        # gene -> {observed (rsID, copies) tuple: GeneCall}. Bounded by the
+        # tables (3 states per defining variant) and small in practice.
+        self._calls = {gene: {} for gene in genes}
+        # Genes without any variant all resolve to the same call
+        self.reference = {gene: self._score(gene, ()) for gene in genes}
+
+    def resolve(self, genotypes: dict) -> dict:
+        """Returns gene -> GeneCall for every gene in the tables."""
+        observed = {} # gene -> [(rsID, variant copies)]
+        index = self.index
+        for rsid, genotype in genotypes.items():
+            entry = index.get(rsid)
+            # Every definition is a single-base change; anything else can't be counted
+            if entry is None or genotype is None or len(genotype) != 2:
+                continue
+            gene, variant = entry
+            copies = (genotype[0] == variant) + (genotype[1] == variant)
+            if copies:
+                observed.setdefault(gene, []).append((rsid, copies))
+
+        calls = dict(self.reference)
+        for gene, copies in observed.items():
+            memo = self._calls.get(gene)
+            if memo is None:
+                continue
+            key = tuple(sorted(copies)) if len(copies) > 1 else tuple(copies)
+            call = memo.get(key)
+            if call is None:
+                call = memo[key] = self._score(gene, self._match(gene, dict(copies)))
+            calls[gene] = call
+        return calls
+
+    def phenotypes(self, genotypes: dict) -> dict:
+        return {gene: call.phenotype for gene, call in self.resolve(genotypes).items()}
+
+    def _match(self, gene: str, copies: dict) -> list:
+        """Non-reference alleles carried, each listed once per copy."""
+        found = []
+        for allele in self.alleles.get(gene, ()):
+            n = min(copies.get(rsid, 0) for rsid in allele.variants)
+            if not n:
+                continue
+            found.extend([allele] * n)
+            for rsid in allele.variants + allele.in_cis:
+                if rsid in copies:
+                    copies[rsid] = max(copies[rsid] - n, 0)
+        return found[:2]
+
+    def _score(self, gene: str, found: list) -> GeneCall:
+        spec = self.genes[gene]
+        n_reference = 2 - len(found)
+        names = [allele.name for allele in found] + [spec.reference] * n_reference
+        score = sum(allele.activity for allele in found) + spec.reference_activity * n_reference
+        phenotype = next(phenotype for bound, phenotype in spec.phenotypes if score <= bound)
+        return GeneCall("/".join(sorted(names, key=_star_order)), phenotype, score)
+
@@ -0,0 +1,231 @@
+"""
+Trains the risk model and writes it to the model registry as a new version:
+
+    python train_model.py [--dataset FILE ...] [--version NAME] [--activate]
+
+Each Excel dataset is converted once into a columnar cache (Parquet with
+pyarrow installed, otherwise a pandas pickle) keyed by the file's content
+hash, so later runs skip openpyxl entirely. Hyperparameters are picked by
+stratified cross-validated grid search, one process per core (--jobs), and
+the best model is scored on a held-out split.
+
+Writes models/<version>/ with model.ubj, labels.json, features.json and
+metadata.json (parameters, CV and test metrics, dataset hashes), checks that
+the server can load it, and with --activate points models/ACTIVE at it.
+Running servers switch to it within a second.
+
+Datasets are either wide (one column per gene holding its phenotype, one
+0/1 column per drug, Final_Risk_Label) like pgx_full_polypharmacy_dataset.xlsx,
+or long (Gene, Phenotype, Drug, Risk_Label) like the repo root's
+pgx_training_dataset.xlsx.
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from app.config import settings
+from model_registry import ARTIFACT_FILES, FEATURES_FILE, METADATA_FILE, ModelArtifacts, ModelRegistry, valid_version
+from training_models import (
+    BASE_DIR, DRUG_GENE_MAP, EXPECTED_FEATURES, LEGACY_FILES, PHENOTYPE_GENES, LoadedModel, load_estimator,
+)
+
+DEFAULT_DATASET = os.path.join(BASE_DIR, "pgx_full_polypharmacy_dataset.xlsx")
+CACHE_DIR = os.path.join(BASE_DIR, ".cache", "datasets")
+CACHE_FORMAT = "parquet" if importlib.util.find_spec("pyarrow") else "pickle"
+
+# Searched exhaustively; 27 candidates x --folds fits
+PARAM_GRID = {
+    "n_estimators": [100, 200, 400],
+    "max_depth": [3, 4, 6],
+    "learning_rate": [0.05, 0.1, 0.3],
+}
+SEED = 42
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_dataset(path: str, cache_dir: str = CACHE_DIR):
+    """Returns (frame, sha256 of the file), reading Excel only on a cache miss."""
+    digest = _file_digest(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(cache_dir, f"{stem}-{digest[:16]}.{CACHE_FORMAT}")
+    if os.path.exists(cache_path):
+        df = pd.read_parquet(cache_path) if CACHE_FORMAT == "parquet" else pd.read_pickle(cache_path)
+        return df, digest
+
+    df = pd.read_excel(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Written under a temporary name so a crash never leaves a truncated cache
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    if CACHE_FORMAT == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, cache_path)
+    return df, digest
+
+
+def encode(df: pd.DataFrame):
+    """Returns (X, risk labels) in EXPECTED_FEATURES column order."""
+    feature_index = {name: i for i, name in enumerate(EXPECTED_FEATURES)}
+    X = np.zeros((len(df), len(EXPECTED_FEATURES)), dtype=np.float32)
+    rows = np.arange(len(df))
+
+    if "Gene" in df.columns:
+        # Long format: one gene phenotype and one drug per row
+        keys = df["Gene"].astype(str).str.upper() + "_" + df["Phenotype"].astype(str).str.upper()
+        for column in (keys, df["Drug"].astype(str).str.upper()):
+            cols = column.map(feature_index)
+            known = cols.notna().to_numpy()
+            X[rows[known], cols[known].astype(int).to_numpy()] = 1
+        return X, df["Risk_Label"].astype(str).to_numpy()
+
+    for gene in PHENOTYPE_GENES:
+        if gene not in df.columns:
+            continue
+        cols = (gene + "_" + df[gene].astype(str).str.upper()).map(feature_index)
+        known = cols.notna().to_numpy()
+        X[rows[known], cols[known].astype(int).to_numpy()] = 1
+    for drug in DRUG_GENE_MAP:
+        if drug in df.columns:
+            X[:, feature_index[drug]] = df[drug].to_numpy(dtype=np.float32)
+    return X, df["Final_Risk_Label"].astype(str).to_numpy()
+
+
+def search(X: np.ndarray, y: np.ndarray, folds: int, jobs: int):
+    """Grid search over PARAM_GRID; returns the fitted GridSearchCV."""
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+    from xgboost import XGBClassifier
+
+    # Parallelism is across candidates/folds (processes), so each fit stays single-threaded
+    estimator = XGBClassifier(tree_method="hist", n_jobs=1, random_state=SEED, eval_metric="mlogloss")
+    grid = GridSearchCV(
+        estimator,
+        PARAM_GRID,
+        scoring={"f1_macro": "f1_macro", "accuracy": "accuracy"},
+        refit="f1_macro",
+        cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=SEED),
+        n_jobs=jobs,
+    )
+    grid.fit(X, y)
+    return grid
+
+
+def export(grid, class_labels: list, version: str, registry_dir: str, metadata: dict) -> str:
+    """
+    Writes the version directory under a temporary name and renames it into
+    place, so the registry never lists a half-written version.
+    """
+    if not valid_version(version):
+        raise SystemExit(f"Invalid model version name: {version!r}")
+    directory = os.path.join(registry_dir, version)
+    if os.path.exists(directory):
+        raise SystemExit(f"Model version {version} already exists in {registry_dir}")
+    os.makedirs(registry_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{version}.", dir=registry_dir)
+
+    model_file, labels_file = ARTIFACT_FILES["native"]
+    booster = grid.best_estimator_.get_booster()
+    booster.feature_names = list(EXPECTED_FEATURES)
+    booster.save_model(os.path.join(tmp_dir, model_file))
+    for name, content in ((labels_file, class_labels), (FEATURES_FILE, EXPECTED_FEATURES),
+                          (METADATA_FILE, metadata)):
+        with open(os.path.join(tmp_dir, name), "w") as f:
+            json.dump(content, f, indent=2)
+
+    # Loaded and validated exactly as the server would before it can be activated
+    artifacts = ModelArtifacts(version, os.path.join(tmp_dir, model_file), os.path.join(tmp_dir, labels_file),
+                               "native", os.path.join(tmp_dir, FEATURES_FILE))
+    estimator, labels = load_estimator(artifacts)
+    LoadedModel(estimator, labels, version, "native").validate(artifacts.features())
+
+    os.rename(tmp_dir, directory)
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the risk model and add it to the model registry.")
+    parser.add_argument("--dataset", action="append",
+                        help=f"Excel dataset, repeatable (default: {os.path.basename(DEFAULT_DATASET)})")
+    parser.add_argument("--version", help="Version name (default: UTC timestamp)")
+    parser.add_argument("--registry", help="Registry directory (default: MODEL_REGISTRY_DIR)")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds (default: 5)")
+    parser.add_argument("--jobs", type=int, default=-1, help="Worker processes for the search (default: all cores)")
+    parser.add_argument("--test-size", type=float, default=0.2, help="Held-out fraction (default: 0.2)")
+    parser.add_argument("--activate", action="store_true", help="Point ACTIVE at the new version")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Dataset cache directory")
+    args = parser.parse_args()
+
+    from sklearn.metrics import accuracy_score, f1_score
+    from sklearn.model_selection import train_test_split
+    import xgboost
+
+    started = time.perf_counter()
+    datasets = args.dataset or [DEFAULT_DATASET]
+    frames, sources = [], []
+    for path in datasets:
+        df, digest = load_dataset(path, args.cache_dir)
+        frames.append(encode(df))
+        sources.append({"file": os.path.basename(path), "sha256": digest, "rows": len(df)})
+    X = np.concatenate([X for X, _ in frames])
+    labels = np.concatenate([y for _, y in frames])
+    loaded_at = time.perf_counter()
+    print(f"Loaded {len(X)} rows from {len(datasets)} dataset(s) in {loaded_at - started:.2f}s ({CACHE_FORMAT} cache)")
+
+    class_labels, y = np.unique(labels, return_inverse=True)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_size, stratify=y, random_state=SEED
+    )
+    grid = search(X_train, y_train, args.folds, args.jobs)
+    best = grid.best_index_
+    predicted = grid.predict(X_test)
+    trained_at = time.perf_counter()
+    print(f"Searched {len(grid.cv_results_['params'])} candidates x {args.folds} folds "
+          f"in {trained_at - loaded_at:.2f}s, best {grid.best_params_}")
+
+    version = args.version or datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    metadata = {
+        "version": version,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "algorithm": f"xgboost {xgboost.__version__}",
+        "params": grid.best_params_,
+        "datasets": sources,
+        "class_counts": {str(label): int(count) for label, count in zip(class_labels, np.bincount(y))},
+        "cv": {
+            "folds": args.folds,
+            "f1_macro": float(grid.cv_results_["mean_test_f1_macro"][best]),
+            "f1_macro_std": float(grid.cv_results_["std_test_f1_macro"][best]),
+            "accuracy": float(grid.cv_results_["mean_test_accuracy"][best]),
+        },
+        "test": {
+            "rows": len(y_test),
+            "f1_macro": float(f1_score(y_test, predicted, average="macro")),
+            "accuracy": float(accuracy_score(y_test, predicted)),
+        },
+        "train_seconds": round(trained_at - started, 2),
+    }
+
+    registry = ModelRegistry(args.registry or os.path.join(BASE_DIR, settings.MODEL_REGISTRY_DIR), BASE_DIR, LEGACY_FILES)
+    directory = export(grid, [str(label) for label in class_labels], version, registry.root, metadata)
+    print(f"Wrote {directory}: CV macro-F1 {metadata['cv']['f1_macro']:.3f}, "
+          f"test accuracy {metadata['test']['accuracy']:.3f}")
+
+    if args.activate:
+        registry.set_active(version)
+        print(f"Activated {version}")
+
+
+if __name__ == "__main__":
+    main()
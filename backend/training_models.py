@@ -1,136 +1,507 @@
-import joblib
-import pandas as pd
+import json
 import numpy as np
 import os
 import random
+import threading
+import time
+from datetime import datetime
+from itertools import product
+from typing import Optional
+from app.config import settings
+from model_registry import ModelArtifacts, ModelRegistry, ModelValidationError
+from star_alleles import StarAlleleEngine
+from app.utils import metrics
+# joblib (and through it scikit-learn), pandas and xgboost are imported on
+# first model load, not at import time, so the server starts quickly.
 
 # Get the directory of the current file to load models correctly
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILE = "pgx_polypharmacy_xgb_model.pkl"
+LABEL_ENCODER_FILE = "pgx_label_encoder.pkl"
+# Native XGBoost export of the same model (see export_model.py). Loads
+# without unpickling and without scikit-learn.
+NATIVE_MODEL_FILE = "pgx_polypharmacy_xgb_model.ubj"
+NATIVE_LABELS_FILE = "pgx_label_classes.json"
+# Served when the model registry (settings.MODEL_REGISTRY_DIR) has no active version
+LEGACY_FILES = {
+    "native": (NATIVE_MODEL_FILE, NATIVE_LABELS_FILE),
+    "pickle": (MODEL_FILE, LABEL_ENCODER_FILE),
+}
+
+# How often (seconds) predict() re-reads the registry to pick up a new version
+ARTIFACT_CHECK_INTERVAL = 1.0
+
+# Larger feature spaces are served straight from the model instead of a table
+MAX_RISK_TABLE_SIZE = 5_000_000
+
+# Try to find relevant gene for drug (Knowledge Base would be better here)
+DRUG_GENE_MAP = {
+    "CLOPIDOGREL": "CYP2C19",
+    "WARFARIN": "CYP2C9", # or VKORC1
+    "CODEINE": "CYP2D6",
+    "SIMVASTATIN": "SLCO1B1",
+    "AZATHIOPRINE": "TPMT",
+    "FLUOROURACIL": "DPYD"
+}
+
+# Features the encoder can produce: a one-hot phenotype per gene plus one
+# column per drug. Every model version must be trained on exactly these.
+PHENOTYPE_GENES = ("CYP2C19", "CYP2D6", "CYP2C9", "SLCO1B1", "TPMT", "DPYD")
+PHENOTYPES = ("IM", "NM", "PM", "RM", "URM")
+EXPECTED_FEATURES = [f"{gene}_{pheno}" for gene in PHENOTYPE_GENES for pheno in PHENOTYPES] + list(DRUG_GENE_MAP)
+
+class RiskTable:
+    """
+    Array-indexed (phenotype vector, drug) -> (label, confidence) table.
+
+    The model's inputs are one one-hot group per gene plus one one-hot drug,
+    so every row it can be asked about is identified by a mixed-radix key:
+    one digit per gene (its phenotype, or "none") and one for the drug.
+    Rows are scored in bulk by predict_rows(X) -> (class index, confidence)
+    either all at once (fill_all) or on first use.
+    """
+
+    def __init__(self, feature_names: list, predict_rows):
+        self.n_features = len(feature_names)
+        self.predict_rows = predict_rows
+        self._lock = threading.Lock()
+
+        gene_cols = {}
+        drug_cols = []
+        for col, name in enumerate(feature_names):
+            if "_" in name:
+                gene, pheno = name.rsplit("_", 1)
+                gene_cols.setdefault(gene, []).append((pheno, col))
+            else:
+                drug_cols.append((name, col))
+
+        # Each gene digit has one state per phenotype plus a trailing "none"
+        self.genes = list(gene_cols)
+        self.pheno_states = [{pheno: i for i, (pheno, _) in enumerate(gene_cols[g])} for g in self.genes]
+        self.gene_luts = [np.array([col for _, col in gene_cols[g]] + [-1]) for g in self.genes]
+        self.drug_states = {name: i for i, (name, _) in enumerate(drug_cols)}
+        self.drug_lut = np.array([col for _, col in drug_cols] + [-1])
+
+        self.radices = [len(lut) for lut in self.gene_luts] + [len(self.drug_lut)]
+        self.strides = []
+        stride = 1
+        for radix in reversed(self.radices):
+            self.strides.append(stride)
+            stride *= radix
+        self.strides.reverse()
+        self.size = stride
+
+        self.class_idx = np.full(self.size, -1, dtype=np.int16) # -1 = not computed yet
+        self.confidence = np.zeros(self.size, dtype=np.float32)
+
+    def keys(self, phenotypes_list: list, drugs: list) -> np.ndarray:
+        drug_digits = [self.drug_states.get(drug.upper(), len(self.drug_states)) for drug in drugs]
+        keys = np.empty(len(phenotypes_list) * len(drugs), dtype=np.int64)
+        row = 0
+        for phenotypes in phenotypes_list:
+            base = 0
+            for gene, states, stride in zip(self.genes, self.pheno_states, self.strides):
+                base += states.get(phenotypes.get(gene), len(states)) * stride
+            for digit in drug_digits:
+                keys[row] = base + digit
+                row += 1
+        return keys
+
+    def lookup(self, keys: np.ndarray):
+        """Returns (class index, confidence) arrays for the keys, scoring any misses."""
+        missing = keys[self.class_idx[keys] < 0]
+        if missing.size:
+            self._fill(np.unique(missing))
+        return self.class_idx[keys], self.confidence[keys]
+
+    def fill_all(self):
+        """Scores every combination of in-vocabulary phenotypes and drugs."""
+        digit_ranges = [range(radix - 1) for radix in self.radices[:-1]] + [range(self.radices[-1])]
+        keys = np.array([sum(d * s for d, s in zip(digits, self.strides))
+                         for digits in product(*digit_ranges)], dtype=np.int64)
+        self._fill(keys)
+
+    def _rows(self, keys: np.ndarray) -> np.ndarray:
+        X = np.zeros((len(keys), self.n_features), dtype=np.float32)
+        rows = np.arange(len(keys))
+        for lut, radix, stride in zip(self.gene_luts + [self.drug_lut], self.radices, self.strides):
+            cols = lut[(keys // stride) % radix]
+            hit = cols >= 0
+            X[rows[hit], cols[hit]] = 1
+        return X
+
+    def _fill(self, keys: np.ndarray):
+        class_idx, confidence = self.predict_rows(self._rows(keys))
+        with self._lock:
+            self.confidence[keys] = confidence
+            # Written last: a non-negative class index marks the row complete
+            self.class_idx[keys] = class_idx
+
+
+class NativeXGBModel:
+    """
+    predict_proba-compatible wrapper around an xgboost Booster saved in its
+    native JSON/UBJ format, with the risk label of each class in a JSON list.
+    """
+
+    def __init__(self, model_path: str, labels_path: str):
+        import xgboost
+        self.booster = xgboost.Booster()
+        self.booster.load_model(model_path)
+        with open(labels_path) as f:
+            self.labels = json.load(f)
+        self.classes_ = np.arange(len(self.labels))
+
+    def get_booster(self):
+        return self.booster
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        prob = self.booster.inplace_predict(X)
+        if prob.ndim == 1:
+            # binary:logistic only returns P(class 1)
+            prob = np.column_stack([1 - prob, prob])
+        return prob
+
+
+def load_estimator(artifacts: ModelArtifacts):
+    """Loads one version's estimator, returning (estimator, class labels)."""
+    if artifacts.format == "native":
+        estimator = NativeXGBModel(artifacts.model_path, artifacts.labels_path)
+        return estimator, [str(label) for label in estimator.labels]
+    import joblib
+    estimator = joblib.load(artifacts.model_path)
+    le = joblib.load(artifacts.labels_path)
+    class_labels = []
+    if hasattr(estimator, "classes_"):
+        class_labels = [str(label) for label in le.inverse_transform(estimator.classes_)]
+    return estimator, class_labels
+
+
+class LoadedModel:
+    """
+    One loaded model version and everything derived from it (feature index,
+    class labels, risk table). Never modified after it is swapped in, so a
+    reload replaces the whole object and in-flight predictions finish on the
+    version they started with.
+    """
+
+    def __init__(self, estimator, class_labels: list, version: str, model_format: str):
+        self.estimator = estimator
+        self.class_labels = class_labels # Decoded risk label for each model output column
+        self.version = version
+        self.format = model_format
+        self.loaded_at = datetime.now().isoformat()
+        self.risk_table = None
+
+        # Resolve the feature names once and build the feature-name -> column
+        # index used to encode prediction rows
+        feature_names = []
+        if hasattr(estimator, "feature_names_in_"):
+            feature_names = estimator.feature_names_in_
+        elif hasattr(estimator, "get_booster"):
+            feature_names = estimator.get_booster().feature_names or []
+        self.feature_names = [str(name) for name in feature_names]
+        self.feature_index = {name: i for i, name in enumerate(self.feature_names)}
+        # Plain sklearn estimators warn when given arrays without column names
+        self._predict_on_frame = not hasattr(estimator, "get_booster") and hasattr(estimator, "feature_names_in_")
+
+    def validate(self, schema: Optional[list]):
+        """Raises ModelValidationError unless this version can be served as is."""
+        if schema is not None and schema != self.feature_names:
+            raise ModelValidationError("Model features do not match its features.json")
+        missing = sorted(set(EXPECTED_FEATURES) - set(self.feature_names))
+        unexpected = sorted(set(self.feature_names) - set(EXPECTED_FEATURES))
+        if missing or unexpected:
+            raise ModelValidationError(f"Feature schema mismatch: missing {missing}, unexpected {unexpected}")
+        if not self.class_labels:
+            raise ModelValidationError("Model has no class labels")
+        # One row end to end, so a broken estimator never gets to serve
+        try:
+            best, _ = self.predict_rows(np.zeros((1, len(self.feature_names)), dtype=np.float32))
+        except Exception as e:
+            raise ModelValidationError(f"Test prediction failed: {e}")
+        if not 0 <= best[0] < len(self.class_labels):
+            raise ModelValidationError("Model outputs more classes than it has labels")
+
+    def build_risk_table(self, mode: str):
+        if mode == "off" or not self.feature_names:
+            return
+        table = RiskTable(self.feature_names, self.predict_rows)
+        if table.size > MAX_RISK_TABLE_SIZE:
+            print(f"Feature space too large for a risk table ({table.size} rows), using the model directly.")
+            return
+        if mode == "eager":
+            try:
+                table.fill_all()
+            except Exception as e:
+                print(f"Risk table build failed: {e}")
+                return
+        self.risk_table = table
+
+    def encode(self, phenotypes_list: list, drugs: list) -> np.ndarray:
+        """
+        Builds the one-hot feature matrix, one row per (patient, drug).
+        Based on inspect_model output, features are like 'WARFARIN', 'CYP2C19_PM'.
+        """
+        X = np.zeros((len(phenotypes_list) * len(drugs), len(self.feature_names)), dtype=np.float32)
+        drug_cols = [self.feature_index.get(drug.upper()) for drug in drugs]
+        row = 0
+        for phenotypes in phenotypes_list:
+            pheno_cols = [self.feature_index[key] for key in
+                          (f"{gene}_{pheno}" for gene, pheno in phenotypes.items())
+                          if key in self.feature_index]
+            for drug_col in drug_cols:
+                X[row, pheno_cols] = 1
+                if drug_col is not None:
+                    X[row, drug_col] = 1
+                row += 1
+        return X
+
+    def infer(self, phenotypes_list: list, drugs: list):
+        """
+        Returns (risk labels, confidences), one per (patient, drug) row.
+        """
+        n_rows = len(phenotypes_list) * len(drugs)
+        if n_rows == 0:
+            return [], []
+
+        try:
+            table = self.risk_table
+            if table is not None:
+                best, confidences = table.lookup(table.keys(phenotypes_list, drugs))
+            else:
+                best, confidences = self.predict_rows(self.encode(phenotypes_list, drugs))
+
+            # Decode Labels
+            labels = [self.class_labels[i] for i in best]
+            confidences = confidences.astype(float).tolist()
+        except Exception as e:
+            print(f"Prediction error: {e}")
+            metrics.MODEL_ERRORS.inc()
+            labels = ["Unknown"] * n_rows
+            confidences = [0.0] * n_rows
+        return labels, confidences
+
+    def predict_rows(self, X: np.ndarray):
+        """
+        Returns (class index, confidence) for each encoded row.
+        """
+        if self._predict_on_frame:
+            import pandas as pd
+            X = pd.DataFrame(X, columns=self.feature_names)
+        # predict() is the argmax of predict_proba, so one call gives both
+        prediction_prob = self.estimator.predict_proba(X)
+        best = prediction_prob.argmax(axis=1)
+        return best, prediction_prob[np.arange(len(best)), best]
+
 
 class PharmacogenomicModel:
-    def __init__(self):
+    def __init__(self, risk_table: str = "off"):
+        # "off": always call the model, "lazy": memoize rows in a RiskTable
+        # on first use, "eager": fill the whole table at load time
+        self.risk_table_mode = risk_table
+        self._reload_lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        # The served version, swapped by a single assignment. Loaded by
+        # load(), on first prediction or by warmup.
+        self.active: Optional[LoadedModel] = None
+        self.state = "unloaded" # unloaded | loading | ready | unavailable
+        self.error = None
+        self.load_seconds = None
+        self._artifact_stamp = None
+        self._current_version = None # (checked at, version) cached by current_version()
+        # Allele tables compiled once into the lookup index
+        self.alleles = StarAlleleEngine()
+
+    def registry(self) -> ModelRegistry:
+        return ModelRegistry(os.path.join(BASE_DIR, settings.MODEL_REGISTRY_DIR), BASE_DIR, LEGACY_FILES)
+
+    def load(self):
+        """Loads the active model version unless already loaded. Thread-safe."""
+        if self.state in ("ready", "unavailable"):
+            return
+        with self._reload_lock:
+            if self.state in ("ready", "unavailable"):
+                return
+            self.state = "loading"
+            self._reload()
+            self._checked_at = time.monotonic()
+
+    def status(self) -> dict:
+        active = self.active
+        return {
+            "state": self.state,
+            "version": active.version if active else None,
+            "format": active.format if active else None,
+            "loaded_at": active.loaded_at if active else None,
+            "model_available": active is not None,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+    def _load_version(self, artifacts: ModelArtifacts) -> LoadedModel:
         try:
-            self.model = joblib.load(os.path.join(BASE_DIR, "pgx_polypharmacy_xgb_model.pkl"))
-            self.le = joblib.load(os.path.join(BASE_DIR, "pgx_label_encoder.pkl"))
-            print("Models loaded successfully.")
+            estimator, class_labels = load_estimator(artifacts)
         except Exception as e:
+            raise ModelValidationError(f"Could not load model {artifacts.version}: {e}")
+        loaded = LoadedModel(estimator, class_labels, artifacts.version, artifacts.format)
+        loaded.validate(artifacts.features())
+        loaded.build_risk_table(self.risk_table_mode)
+        return loaded
+
+    def _reload(self):
+        """
+        Loads the active version and swaps it in if it validates; otherwise
+        the current version keeps serving. Called with _reload_lock held.
+        """
+        started = time.perf_counter()
+        artifacts = self.registry().artifacts()
+        self._current_version = None
+        # Recorded even on failure, so a bad version isn't retried every check
+        self._artifact_stamp = (artifacts.version, artifacts.stamp)
+        try:
+            loaded = self._load_version(artifacts)
+        except ModelValidationError as e:
             print(f"Error loading models: {e}")
-            self.model = None
-            self.le = None
+            self.error = str(e)
+            if self.active is None:
+                self.state = "unavailable"
+            return
+        self.active = loaded
+        self.error = None
+        self.load_seconds = time.perf_counter() - started
+        self.state = "ready"
+        print(f"Model {loaded.version} loaded successfully.")
+
+    def activate(self, version: str) -> dict:
+        """
+        Validates a registry version and makes it the active one: here at
+        once, in other worker processes on their next artifact check.
+        Raises ModelValidationError (and leaves ACTIVE alone) if it is invalid.
+        """
+        registry = self.registry()
+        with self._reload_lock:
+            started = time.perf_counter()
+            loaded = self._load_version(registry.artifacts(version))
+            registry.set_active(version)
+            artifacts = registry.artifacts()
+            self._artifact_stamp = (artifacts.version, artifacts.stamp)
+            self._current_version = None
+            self.active = loaded
+            self.error = None
+            self.load_seconds = time.perf_counter() - started
+            self.state = "ready"
+        print(f"Model {version} activated.")
+        return self.status()
+
+    def current_version(self) -> str:
+        """
+        Version of the active artifacts on disk, without loading them. Worker
+        processes reload to this version on their next prediction. Read at
+        most every ARTIFACT_CHECK_INTERVAL, so it may briefly lag a switch.
+        """
+        now = time.monotonic()
+        cached = self._current_version
+        if cached is not None and now - cached[0] < ARTIFACT_CHECK_INTERVAL:
+            return cached[1]
+        version = self.registry().artifacts().version
+        self._current_version = (now, version)
+        return version
+
+    def _check_artifacts(self):
+        """
+        Reloads the model (and rebuilds the risk table) if ACTIVE now names
+        another version or the artifact files changed on disk. Checks at most
+        every ARTIFACT_CHECK_INTERVAL.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < ARTIFACT_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        artifacts = self.registry().artifacts()
+        if (artifacts.version, artifacts.stamp) == self._artifact_stamp:
+            return
+        with self._reload_lock:
+            artifacts = self.registry().artifacts()
+            if (artifacts.version, artifacts.stamp) != self._artifact_stamp:
+                print("Model artifacts changed on disk, reloading.")
+                self._reload()
 
     def map_genotypes_to_phenotypes(self, genotypes: dict) -> dict:
         """
-        Maps rsID genotypes to Gene Phenotypes.
-        Simplified logic for demonstration.
-        """
-        # Default to Normal Metabolizer (NM)
-        phenotypes = {
-            "CYP2C19": "NM",
-            "CYP2D6": "NM",
-            "CYP2C9": "NM",
-            "SLCO1B1": "NM",
-            "TPMT": "NM",
-            "DPYD": "NM"
-        }
-        
-        # Example Simplified Mapping (This is illustrative, not exhaustive clinically)
-        # CYP2C19
-        if "rs4244285" in genotypes: # CYP2C19*2
-             phenotypes["CYP2C19"] = "PM"
-        elif "rs12248560" in genotypes: # CYP2C19*17
-             phenotypes["CYP2C19"] = "URM"
-             
-        # CYP2D6 (Highly complex, simplified here)
-        if "rs3892097" in genotypes: # CYP2D6*4
-            phenotypes["CYP2D6"] = "PM"
-            
-        # SLCO1B1
-        if "rs4149056" in genotypes: # *5
-            phenotypes["SLCO1B1"] = "PM"
-
-        return phenotypes
+        Maps rsID genotypes to Gene Phenotypes (e.g. {"CYP2C19": "IM"}).
+        """
+        return self.alleles.phenotypes(genotypes)
 
     def predict(self, genotypes: dict, drug: str) -> dict:
         """
         Predicts risk, gene, phenotype based on genotypes and drug.
         """
-        # 1. Map Genotypes to Phenotypes
-        phenotypes = self.map_genotypes_to_phenotypes(genotypes)
-        
-        # 2. Prepare Features for Model
-        if self.model:
-            # Get feature names from the model
-            if hasattr(self.model, "feature_names_in_"):
-                 feature_names = self.model.feature_names_in_
-            elif hasattr(self.model, "get_booster"):
-                 feature_names = self.model.get_booster().feature_names
+        return self.predict_batch(genotypes, [drug])[0]
+
+    def predict_batch(self, genotypes: dict, drugs: list) -> list:
+        """
+        Predicts every drug for one patient with a single model call.
+        """
+        return self.predict_cohort([genotypes], drugs)[0]
+
+    def predict_cohort(self, genotypes_list: list, drugs: list) -> list:
+        """
+        Predicts every (patient, drug) pair with a single model call.
+        Returns one list of drug results per patient, in input order.
+        """
+        self.load()
+        self._check_artifacts()
+        # One version for the whole call, even if another is swapped in meanwhile
+        active = self.active
+
+        # 1. Resolve Diplotypes and Phenotypes
+        with metrics.timed("phenotype"):
+            calls_list = [self.alleles.resolve(g) for g in genotypes_list]
+            phenotypes_list = [{gene: call.phenotype for gene, call in calls.items()} for calls in calls_list]
+
+        # 2. Score all rows with one table lookup or one predict_proba
+        with metrics.timed("inference"):
+            if active is None:
+                # Fallback if model not loaded
+                n_rows = len(phenotypes_list) * len(drugs)
+                labels, confidences = ["Safe"] * n_rows, [0.5] * n_rows
             else:
-                 feature_names = [] # Should not happen with typical XGBoost
-
-            # Initialize all features to 0
-            features = {name: 0 for name in feature_names}
-            
-            # Set Drug Feature
-            drug_feature = f"DRUG_{drug.upper()}" # Assuming one-hot encoding format like DRUG_NAME
-            # Check if drug feature exists directly or cleaner
-            # Based on inspect_model output, features are like 'WARFARIN', 'CYP2C19_PM'
-            # So it seems it is just the name. 
-            
-            if drug.upper() in features:
-                features[drug.upper()] = 1
-            
-            # Set Phenotype Features
-            for gene, pheno in phenotypes.items():
-                feature_key = f"{gene}_{pheno}"
-                if feature_key in features:
-                    features[feature_key] = 1
-            
-            # Create DataFrame
-            df = pd.DataFrame([features])
-            
-            # Predict
-            try:
-                prediction_idx = self.model.predict(df)[0]
-                prediction_prob = self.model.predict_proba(df)[0]
-                
-                # Decode Label
-                risk_label = self.le.inverse_transform([prediction_idx])[0]
-                confidence = float(np.max(prediction_prob))
-            except Exception as e:
-                print(f"Prediction error: {e}")
-                risk_label = "Unknown"
-                confidence = 0.0
-        else:
-            # Fallback if model not loaded
-            risk_label = "Safe"
-            confidence = 0.5
-
-        # 3. Construct Detailed Response
-        
+                labels, confidences = active.infer(phenotypes_list, drugs)
+
+        # 3. Construct Detailed Responses
+        results = []
+        row = 0
+        for genotypes, calls in zip(genotypes_list, calls_list):
+            # Shared by every drug result of this patient
+            detected_variants = [{"rsid": k, "genotype": v} for k, v in genotypes.items()]
+            patient_results = []
+            for drug in drugs:
+                patient_results.append(self._build_result(
+                    active, genotypes, calls, detected_variants, drug, labels[row], confidences[row]
+                ))
+                row += 1
+            results.append(patient_results)
+        return results
+
+    def _build_result(self, active: Optional[LoadedModel], genotypes: dict, calls: dict,
+                      detected_variants: list, drug: str, risk_label: str, confidence: float) -> dict:
         # Calculate Severity based on risk label
         severity = "low"
         if risk_label in ["Toxic", "High Risk"]:
             severity = "high"
         elif risk_label in ["Adjust Dosage", "Moderate Risk"]:
             severity = "moderate"
-            
+
         # Determine Primary Gene (Simplified: Pick CYP2C19 or first found)
-        primary_gene = "CYP2C19" # Default
-        # Try to find relevant gene for drug (Knowledge Base would be better here)
-        drug_gene_map = {
-            "CLOPIDOGREL": "CYP2C19",
-            "WARFARIN": "CYP2C9", # or VKORC1
-            "CODEINE": "CYP2D6",
-            "SIMVASTATIN": "SLCO1B1",
-            "AZATHIOPRINE": "TPMT",
-            "FLUOROURACIL": "DPYD"
-        }
-        primary_gene = drug_gene_map.get(drug.upper(), "CYP2C19")
-        
+        primary_gene = DRUG_GENE_MAP.get(drug.upper(), "CYP2C19")
+        call = calls.get(primary_gene)
+        diplotype, phenotype = (call.diplotype, call.phenotype) if call else ("*1/*1", "NM")
+
         result = {
             "patient_id": "PATIENT_001", # Placeholder
             "drug": drug,
-            "timestamp": pd.Timestamp.now().isoformat(),
+            "timestamp": datetime.now().isoformat(),
             "risk_assessment": {
                 "risk_label": risk_label,
                 "confidence_score": round(confidence, 2),
@@ -138,24 +509,24 @@ class PharmacogenomicModel:
             },
             "pharmacogenomic_profile": {
                 "primary_gene": primary_gene,
-                "diplotype": "*1/*1", # Placeholder logic
-                "phenotype": phenotypes.get(primary_gene, "NM"),
-                "detected_variants": [{"rsid": k, "genotype": v} for k, v in genotypes.items()]
+                "diplotype": diplotype,
+                "phenotype": phenotype,
+                "detected_variants": detected_variants
             },
             "clinical_recommendation": {
                 "text": f"Based on the {risk_label} risk for {drug}, please consult guidelines."
             },
             "llm_generated_explanation": {
-                "summary": f"The patient is a {phenotypes.get(primary_gene, 'NM')} for {primary_gene}, which affects {drug} metabolism."
+                "summary": f"The patient is a {phenotype} for {primary_gene}, which affects {drug} metabolism."
             },
             "quality_metrics": {
                 "vcf_parsing_success": True,
                 "variant_count": len(genotypes),
-                "model_available": self.model is not None
+                "model_available": active is not None,
+                "model_version": active.version if active else None
             }
         }
-        
-        return result
 
-model = PharmacogenomicModel()
+        return result
 
+model = PharmacogenomicModel(risk_table=settings.PGX_RISK_TABLE)
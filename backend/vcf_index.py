@@ -0,0 +1,185 @@
+import gzip
+import struct
+import zlib
+
+# Minimal reader for tabix (.tbi) and coordinate-sorted (.csi) indexes over
+# bgzip-compressed VCFs. Only what is needed to seek to a few regions.
+
+TBI_MAGIC = b"TBI\x01"
+CSI_MAGIC = b"CSI\x01"
+BGZF_HEADER = struct.Struct("<4BI2BH") # ID1 ID2 CM FLG MTIME XFL OS XLEN
+
+
+class VcfIndex:
+    def __init__(self, min_shift: int, depth: int, names: list, refs: list):
+        self.min_shift = min_shift
+        self.depth = depth
+        self.names = names
+        # One entry per contig: ({bin: [(vbeg, vend), ...]}, linear index or None)
+        self.refs = refs
+        self._by_name = {}
+        for i, name in enumerate(names):
+            self._by_name[name] = i
+
+    def ref_id(self, chrom: str):
+        return self._by_name.get(chrom)
+
+    def chunks(self, ref_id: int, beg: int, end: int) -> list:
+        """Virtual-offset ranges that may hold records overlapping [beg, end)."""
+        bins, linear = self.refs[ref_id]
+        min_off = 0
+        if linear:
+            idx = beg >> self.min_shift
+            min_off = linear[min(idx, len(linear) - 1)]
+        found = []
+        for b in reg2bins(beg, end, self.min_shift, self.depth):
+            for vbeg, vend in bins.get(b, ()):
+                if vend > min_off:
+                    found.append((vbeg, vend))
+        return found
+
+
+def reg2bins(beg: int, end: int, min_shift: int, depth: int) -> list:
+    """Bins overlapping the 0-based half-open interval [beg, end)."""
+    bins = []
+    end -= 1
+    shift = min_shift + depth * 3
+    offset = 0
+    for level in range(depth + 1):
+        bins.extend(range(offset + (beg >> shift), offset + (end >> shift) + 1))
+        shift -= 3
+        offset += 1 << (level * 3)
+    return bins
+
+
+def merge_chunks(chunks) -> list:
+    merged = []
+    for vbeg, vend in sorted(chunks):
+        if merged and vbeg <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], vend))
+        else:
+            merged.append((vbeg, vend))
+    return merged
+
+
+def _parse_names(buf: bytes, pos: int):
+    # Tabix header: format, col_seq, col_beg, col_end, meta, skip, l_nm
+    (l_nm,) = struct.unpack_from("<i", buf, pos + 24)
+    pos += 28
+    names = [n.decode() for n in buf[pos:pos + l_nm].split(b"\x00") if n]
+    return names, pos + l_nm
+
+
+def load_index(data: bytes) -> VcfIndex:
+    """Parses .tbi or .csi index bytes (bgzip compressed or raw)."""
+    try:
+        return _load_index(data)
+    except (struct.error, zlib.error, EOFError) as e:
+        raise ValueError(f"Corrupt index: {e}")
+
+
+def _load_index(data: bytes) -> VcfIndex:
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    magic = data[:4]
+
+    if magic == TBI_MAGIC:
+        (n_ref,) = struct.unpack_from("<i", data, 4)
+        names, pos = _parse_names(data, 8)
+        min_shift, depth = 14, 5
+    elif magic == CSI_MAGIC:
+        min_shift, depth, l_aux = struct.unpack_from("<3i", data, 4)
+        if l_aux < 28:
+            raise ValueError("CSI index has no contig names")
+        names, _ = _parse_names(data, 16)
+        pos = 16 + l_aux
+        (n_ref,) = struct.unpack_from("<i", data, pos)
+        pos += 4
+    else:
+        raise ValueError("Not a tabix or CSI index")
+
+    if len(names) != n_ref:
+        raise ValueError("Index contig names do not match reference count")
+
+    refs = []
+    for _ in range(n_ref):
+        (n_bin,) = struct.unpack_from("<i", data, pos)
+        pos += 4
+        bins = {}
+        for _ in range(n_bin):
+            if magic == TBI_MAGIC:
+                bin_id, n_chunk = struct.unpack_from("<Ii", data, pos)
+                pos += 8
+            else:
+                bin_id, _loffset, n_chunk = struct.unpack_from("<IQi", data, pos)
+                pos += 16
+            offsets = struct.unpack_from(f"<{2 * n_chunk}Q", data, pos)
+            pos += 16 * n_chunk
+            bins[bin_id] = list(zip(offsets[0::2], offsets[1::2]))
+        linear = None
+        if magic == TBI_MAGIC:
+            (n_intv,) = struct.unpack_from("<i", data, pos)
+            pos += 4
+            linear = struct.unpack_from(f"<{n_intv}Q", data, pos)
+            pos += 8 * n_intv
+        refs.append((bins, linear))
+
+    return VcfIndex(min_shift, depth, names, refs)
+
+
+def read_bgzf_block(file_obj, coffset: int):
+    """Returns (uncompressed data, offset of the next block)."""
+    file_obj.seek(coffset)
+    header = file_obj.read(BGZF_HEADER.size)
+    if len(header) < BGZF_HEADER.size:
+        return b"", coffset
+    id1, id2, _cm, flg, _mtime, _xfl, _os, xlen = BGZF_HEADER.unpack(header)
+    if (id1, id2) != (0x1f, 0x8b) or not flg & 4:
+        raise ValueError("Not a bgzip block")
+    extra = file_obj.read(xlen)
+    bsize = None
+    i = 0
+    while i + 4 <= len(extra):
+        slen = struct.unpack_from("<H", extra, i + 2)[0]
+        if extra[i:i + 2] == b"BC" and slen == 2:
+            bsize = struct.unpack_from("<H", extra, i + 4)[0]
+        i += 4 + slen
+    if bsize is None:
+        raise ValueError("Not a bgzip block")
+    cdata = file_obj.read(bsize - xlen - 19)
+    file_obj.read(8) # CRC32 + ISIZE
+    return zlib.decompress(cdata, -zlib.MAX_WBITS), coffset + bsize + 1
+
+
+def read_range(file_obj, vbeg: int, vend: int):
+    """Yields uncompressed bytes between two BGZF virtual offsets."""
+    coffset, ubeg = vbeg >> 16, vbeg & 0xFFFF
+    cend, uend = vend >> 16, vend & 0xFFFF
+    while coffset <= cend:
+        data, next_offset = read_bgzf_block(file_obj, coffset)
+        if not data and next_offset == coffset:
+            return
+        stop = uend if coffset == cend else len(data)
+        yield data[ubeg:stop]
+        ubeg = 0
+        coffset = next_offset
+
+
+def read_header(file_obj) -> bytes:
+    """Uncompressed '#' header lines at the start of a bgzipped VCF."""
+    coffset = 0
+    buf = b""
+    pos = 0 # Start of the first line not yet known to be a header line
+    while True:
+        data, next_offset = read_bgzf_block(file_obj, coffset)
+        if not data and next_offset == coffset:
+            return buf
+        buf += data
+        while pos < len(buf):
+            if buf[pos:pos + 1] != b"#":
+                return buf[:pos]
+            nl = buf.find(b"\n", pos)
+            if nl < 0:
+                break
+            pos = nl + 1
+        coffset = next_offset
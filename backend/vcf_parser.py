@@ -1,48 +1,347 @@
-import pandas as pd
-import io
+import zlib
+import numpy as np
+from pgx_loci import LocusTargets, detect_assembly, normalize_chrom
+import vcf_index
 
-def parse_vcf(file_content: bytes) -> dict:
+# Default read size for streamed uploads. Peak parser memory is bounded by
+# this (plus the longest single line), not by the size of the file.
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# Longest line accepted. Far above any real record (a few KB per sample
+# column set); stops newline-free input from being buffered without bound.
+MAX_LINE_LENGTH = 64 * 1024 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _parse_record(line: str, genotypes: dict, rsid: str = None):
+    if line.startswith('#'):
+        return
+
+    parts = line.strip().split('\t')
+    if len(parts) >= 10:
+        chrom = parts[0]
+        pos = parts[1]
+        rsid = rsid or parts[2]
+        ref = parts[3]
+        alt = parts[4]
+        fmt = parts[8]
+        sample = parts[9]
+
+        # Simple genotype extraction (assuming GT is first field)
+        try:
+            gt_idx = fmt.split(':').index('GT')
+            gt_val = sample.split(':')[gt_idx]
+        except (ValueError, IndexError):
+            return
+
+        # Convert 0/1, 1/1 to Bases
+        alleles = [ref] + alt.split(',')
+        genotype = _genotype(gt_val, alleles)
+        if genotype is not None:
+            genotypes[rsid] = genotype
+
+
+def _genotype(gt_val: str, alleles: list):
+    """'0/1' -> 'AG'; None for no-calls, haploid calls and bad allele indices."""
+    # Handle / or | separators
+    sep = '/' if '/' in gt_val else '|'
+    try:
+        indices = [int(i) for i in gt_val.split(sep) if i != '.']
+        if len(indices) == 2:
+            return f"{alleles[indices[0]]}{alleles[indices[1]]}"
+    except (ValueError, IndexError):
+        pass
+    return None
+
+
+class VcfStreamParser:
+    """
+    Incremental VCF parser.
+    Feed raw bytes in chunks of any size with feed(), then call close() to get
+    the rsID -> Genotype dictionary. Plain text, gzip and bgzip (multi-member
+    gzip) input are detected from the first bytes of the stream.
+
+    With targets set, only records matching one of the target rsIDs (or
+    coordinates, for records without an rsID) are tokenized; everything else
+    is rejected after a scan of the first three columns.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, targets: LocusTargets = None,
+                 compressed: bool = None):
+        self.chunk_size = chunk_size
+        self.targets = targets
+        self.genotypes = {}
+        self.samples = None # Sample column names from the #CHROM header line
+        self.assembly = None # GRCh38/GRCh37 once the header names it
+        self._in_header = True
+        self._head = b""
+        self._compressed = compressed  # None until the first two bytes are seen
+        self._inflater = None
+        self._tail = bytearray() # Incomplete last line
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+
+        if self._compressed is None:
+            # Need the first two bytes to sniff the gzip magic
+            self._head += chunk
+            if len(self._head) < len(GZIP_MAGIC):
+                return
+            chunk, self._head = self._head, b""
+            self._compressed = chunk.startswith(GZIP_MAGIC)
+
+        if self._compressed:
+            self._inflate(chunk)
+        else:
+            self._consume(chunk)
+
+    def close(self) -> dict:
+        if self._head:
+            # Stream shorter than the gzip magic, treat it as text
+            self._consume(self._head)
+            self._head = b""
+        if self._inflater is not None and not self._inflater.eof:
+            raise ValueError("Truncated gzip stream")
+        if self._tail:
+            self._parse_line(bytes(self._tail))
+            self._tail = bytearray()
+        return self.genotypes
+
+    def _inflate(self, data: bytes):
+        # bgzip files are a series of concatenated gzip members, so start a new
+        # decompressor whenever the current member ends.
+        while data:
+            if self._inflater is None:
+                self._inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            inflater = self._inflater
+            self._consume(inflater.decompress(data, self.chunk_size))
+            if inflater.eof:
+                data = inflater.unused_data
+                self._inflater = None
+            else:
+                data = inflater.unconsumed_tail
+
+    def _consume(self, data: bytes):
+        if not data:
+            return
+        # Only the new bytes are searched: the tail never holds a newline
+        cut = data.rfind(b'\n')
+        if cut < 0:
+            self._check_line(len(self._tail) + len(data))
+            self._tail += data
+            return
+        if self._tail:
+            self._check_line(len(self._tail) + data.find(b'\n'))
+            self._tail += data[:cut]
+            buf = bytes(self._tail)
+        else:
+            buf = data[:cut]
+        # Everything after the last newline is an incomplete line
+        self._check_line(len(data) - cut - 1)
+        self._tail = bytearray(data[cut + 1:])
+        # Header chunks are always parsed so the sample names are seen
+        if (self.targets is not None and not self._in_header
+                and not any(n in buf for n in self.targets.needles)):
+            return
+        for line in buf.split(b'\n'):
+            self._parse_line(line)
+
+    @staticmethod
+    def _check_line(length: int):
+        if length > MAX_LINE_LENGTH:
+            raise ValueError(f"Line longer than {MAX_LINE_LENGTH // (1024 * 1024)} MB")
+
+    def _parse_line(self, line: bytes):
+        if not line:
+            return
+        if line[:1] == b'#':
+            if line.startswith(b'#CHROM'):
+                self.samples = line.decode('utf-8').rstrip('\r').split('\t')[9:]
+            elif self.assembly is None:
+                self.assembly = detect_assembly(line)
+            return
+        self._in_header = False
+        if self.targets is None:
+            self._record(line.decode('utf-8'), None)
+            return
+
+        t1 = line.find(b'\t')
+        t2 = line.find(b'\t', t1 + 1) if t1 >= 0 else -1
+        t3 = line.find(b'\t', t2 + 1) if t2 >= 0 else -1
+        if t3 < 0:
+            return
+        rsid = line[t2 + 1:t3]
+        alt = b""
+        if rsid == b".":
+            # Position matches are checked against ALT (column 5)
+            t4 = line.find(b'\t', t3 + 1)
+            t5 = line.find(b'\t', t4 + 1) if t4 >= 0 else -1
+            if t5 < 0:
+                return
+            alt = line[t4 + 1:t5]
+        rsid = self.targets.match(line[:t1], line[t1 + 1:t2], rsid, alt, self.assembly)
+        if rsid is not None:
+            self._record(line.decode('utf-8'), rsid)
+
+    def _record(self, line: str, rsid: str = None):
+        _parse_record(line, self.genotypes, rsid)
+
+
+class GenotypeMatrix:
+    """
+    Genotypes of many samples at a set of loci, as a samples x loci array.
+    codes[s, l] indexes tables[l] (the distinct genotype strings seen at locus
+    l, e.g. ['AG', 'GG']); -1 means no call.
+    """
+
+    def __init__(self, samples: list, rsids: list, codes: np.ndarray, tables: list):
+        self.samples = samples
+        self.rsids = rsids
+        self.codes = codes
+        self.tables = tables
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def sample_genotypes(self, i: int) -> dict:
+        """rsID -> Genotype for one sample, the shape parse_vcf returns."""
+        genotypes = {}
+        for rsid, code, table in zip(self.rsids, self.codes[i].tolist(), self.tables):
+            if code >= 0:
+                genotypes[rsid] = table[code]
+        return genotypes
+
+
+class VcfCohortParser(VcfStreamParser):
+    """
+    VcfStreamParser that reads every sample column of a joint-called VCF.
+    close() returns a GenotypeMatrix. Memory grows with samples x matched
+    loci, so pass targets for large cohorts.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, targets: LocusTargets = None,
+                 compressed: bool = None):
+        super().__init__(chunk_size, targets, compressed)
+        self._columns = {} # rsID -> genotype codes (one per sample)
+        self._tables = {} # rsID -> distinct genotype strings
+
+    def close(self) -> GenotypeMatrix:
+        super().close()
+        samples = self.samples or []
+        rsids = list(self._columns)
+        codes = np.full((len(samples), len(rsids)), -1, dtype=np.int16)
+        for col, rsid in enumerate(rsids):
+            codes[:, col] = self._columns[rsid]
+        return GenotypeMatrix(samples, rsids, codes, [self._tables[rsid] for rsid in rsids])
+
+    def _record(self, line: str, rsid: str = None):
+        parts = line.rstrip('\r').split('\t')
+        if len(parts) < 10:
+            return
+        if self.samples is None:
+            # No #CHROM header: name samples by column
+            self.samples = [f"SAMPLE_{i + 1}" for i in range(len(parts) - 9)]
+        rsid = rsid or parts[2]
+        try:
+            gt_idx = parts[8].split(':').index('GT')
+        except ValueError:
+            return
+        alleles = [parts[3]] + parts[4].split(',')
+
+        column = np.full(len(self.samples), -1, dtype=np.int16)
+        table = []
+        # Cohorts repeat a handful of GT values ('0/0', '0/1', ...), so each
+        # distinct value is decoded once per record.
+        seen = {}
+        for s, sample in enumerate(parts[9:9 + len(self.samples)]):
+            fields = sample.split(':', gt_idx + 1)
+            gt_val = fields[gt_idx] if gt_idx < len(fields) else '.'
+            code = seen.get(gt_val)
+            if code is None:
+                genotype = _genotype(gt_val, alleles)
+                if genotype is None:
+                    code = -1
+                elif genotype in table:
+                    code = table.index(genotype)
+                else:
+                    code = len(table)
+                    table.append(genotype)
+                seen[gt_val] = code
+            column[s] = code
+        self._columns[rsid] = column
+        self._tables[rsid] = table
+
+
+def parse_vcf(file_content: bytes, targets: LocusTargets = None) -> dict:
     """
     Parses a VCF file content and returns a dictionary of rsID -> Genotype.
     Example: {'rs123': 'AA', 'rs456': 'GT'}
     """
-    genotypes = {}
-    
-    # Decode bytes to string
-    content_str = file_content.decode('utf-8')
-    
-    for line in content_str.split('\n'):
-        if line.startswith('#'):
-            continue
-        
-        parts = line.strip().split('\t')
-        if len(parts) >= 10:
-            chrom = parts[0]
-            pos = parts[1]
-            rsid = parts[2]
-            ref = parts[3]
-            alt = parts[4]
-            fmt = parts[8]
-            sample = parts[9]
-            
-            # Simple genotype extraction (assuming GT is first field)
-            try:
-                gt_idx = fmt.split(':').index('GT')
-                gt_val = sample.split(':')[gt_idx]
-                
-                # Convert 0/1, 1/1 to Bases
-                alleles = [ref] + alt.split(',')
-                
-                # Handle / or | separators
-                sep = '/' if '/' in gt_val else '|'
-                indices = [int(i) for i in gt_val.split(sep) if i != '.']
-                
-                if len(indices) == 2:
-                    a1 = alleles[indices[0]]
-                    a2 = alleles[indices[1]]
-                    genotypes[rsid] = f"{a1}{a2}"
-                    
-            except (ValueError, IndexError):
-                continue
-                
-    return genotypes
+    parser = VcfStreamParser(targets=targets)
+    parser.feed(file_content)
+    return parser.close()
+
+
+def parse_vcf_stream(file_obj, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     targets: LocusTargets = None) -> dict:
+    """
+    Parses a binary file-like object (.vcf, .vcf.gz or bgzip) in fixed-size
+    chunks and returns a dictionary of rsID -> Genotype.
+    """
+    return _feed_stream(VcfStreamParser(chunk_size, targets), file_obj, chunk_size)
+
+
+def parse_vcf_indexed(file_obj, index_data: bytes, targets: LocusTargets) -> dict:
+    """
+    Parses only the target regions of a bgzipped VCF using its .tbi/.csi index.
+    file_obj must be seekable. Raises ValueError if the file or index can't be used.
+    """
+    parser = VcfStreamParser(targets=targets, compressed=False)
+    # The header names the assembly, which decides the regions to read
+    parser.feed(vcf_index.read_header(file_obj))
+    return _feed_indexed(parser, file_obj, index_data, targets)
+
+
+def parse_vcf_cohort_stream(file_obj, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            targets: LocusTargets = None) -> GenotypeMatrix:
+    """Like parse_vcf_stream, but keeps every sample column."""
+    return _feed_stream(VcfCohortParser(chunk_size, targets), file_obj, chunk_size)
+
+
+def parse_vcf_cohort_indexed(file_obj, index_data: bytes, targets: LocusTargets) -> GenotypeMatrix:
+    """Like parse_vcf_indexed, but keeps every sample column."""
+    parser = VcfCohortParser(targets=targets, compressed=False)
+    # Sample names live in the header, which the index doesn't cover
+    parser.feed(vcf_index.read_header(file_obj))
+    return _feed_indexed(parser, file_obj, index_data, targets)
+
+
+def _feed_stream(parser: VcfStreamParser, file_obj, chunk_size: int):
+    while True:
+        chunk = file_obj.read(chunk_size)
+        if not chunk:
+            break
+        parser.feed(chunk)
+    return parser.close()
+
+
+def _feed_indexed(parser: VcfStreamParser, file_obj, index_data: bytes, targets: LocusTargets):
+    index = vcf_index.load_index(index_data)
+    contigs = {}
+    for name in index.names:
+        contigs.setdefault(normalize_chrom(name), index.ref_id(name))
+
+    chunks = []
+    for chrom, beg, end in targets.regions(parser.assembly):
+        ref_id = contigs.get(normalize_chrom(chrom))
+        if ref_id is not None:
+            chunks.extend(index.chunks(ref_id, beg, end))
+
+    # Index chunks start and end on record boundaries, so the ranges can be
+    # fed to the parser as plain text.
+    for vbeg, vend in vcf_index.merge_chunks(chunks):
+        for data in vcf_index.read_range(file_obj, vbeg, vend):
+            parser.feed(data)
+        parser.feed(b'\n')
+    return parser.close()